@@ -181,11 +181,20 @@ async function deleteCategory(categoryId) {
 }
 
 // Products API
-async function getProducts(categoryId = null) {
-    let endpoint = '/api/products/product';
+// Pass `page` ({ limit, cursor }) to fetch one page: data is then { results, next }
+async function getProducts(categoryId = null, page = null) {
+    const params = new URLSearchParams();
     if (categoryId) {
-        endpoint += `?category_id=${categoryId}`;
+        params.append('category_id', categoryId);
     }
+    if (page) {
+        params.append('limit', page.limit);
+        if (page.cursor) {
+            params.append('cursor', page.cursor);
+        }
+    }
+    const query = params.toString();
+    const endpoint = query ? `/api/products/product?${query}` : '/api/products/product';
     const response = await apiCall(endpoint, 'GET', null, false, PRODUCTS_API_URL);
     return {
         success: response.success,
@@ -203,6 +212,16 @@ async function getProductById(productId) {
     };
 }
 
+// Batch lookup: data is { results, missing }; at most 100 ids per call
+async function getProductsByIds(productIds) {
+    const response = await apiCall(`/api/products/product?ids=${productIds.join(',')}`, 'GET', null, false, PRODUCTS_API_URL);
+    return {
+        success: response.success,
+        data: response.data,
+        error: response.data.error || 'Failed to load products'
+    };
+}
+
 async function createProduct(data) {
     const response = await apiCall('/api/products/product', 'POST', data, true, PRODUCTS_API_URL);
     return {
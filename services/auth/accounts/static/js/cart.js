@@ -15,6 +15,19 @@ async function fetchProductDetails(productId) {
     return { name: `Product ${productId}`, price: 0 };
 }
 
+// Warm productsCache for all cart items with batched lookups
+async function prefetchProductDetails(productIds) {
+    const missing = [...new Set(productIds)].filter(id => !productsCache[id]);
+    for (let i = 0; i < missing.length; i += 100) {
+        const result = await getProductsByIds(missing.slice(i, i + 100));
+        if (result.success) {
+            result.data.results.forEach(product => {
+                productsCache[product.id] = product;
+            });
+        }
+    }
+}
+
 async function loadCart() {
     const items = await getCart(true);
     const emptyMessage = document.getElementById('empty-cart-message');
@@ -34,6 +47,8 @@ async function loadCart() {
     
     let subtotal = 0;
     
+    await prefetchProductDetails(items.map(item => item.product_id));
+    
     for (const item of items) {
         const product = await fetchProductDetails(item.product_id);
         const total = parseFloat(item.price) * item.quantity;
@@ -19,6 +19,19 @@ async function fetchProductDetails(productId) {
     return { name: `Product ${productId}`, price: 0 };
 }
 
+// Warm productsCache for all cart items with batched lookups
+async function prefetchProductDetails(productIds) {
+    const missing = [...new Set(productIds)].filter(id => !productsCache[id]);
+    for (let i = 0; i < missing.length; i += 100) {
+        const result = await getProductsByIds(missing.slice(i, i + 100));
+        if (result.success) {
+            result.data.results.forEach(product => {
+                productsCache[product.id] = product;
+            });
+        }
+    }
+}
+
 function initMap() {
     // Default to a central location
     const defaultLocation = { lat: 40.7128, lng: -74.0060 };
@@ -159,6 +172,8 @@ async function loadOrderSummary() {
     
     let subtotal = 0;
     
+    await prefetchProductDetails(items.map(item => item.product_id));
+    
     for (const item of items) {
         const product = await fetchProductDetails(item.product_id);
         const total = parseFloat(item.price) * item.quantity;
@@ -0,0 +1,92 @@
+"""
+Local replica of the product catalog.
+
+Polls the products service change feed (GET /api/products/changes) from a
+background thread and keeps an in-memory {product_id: product} map current.
+Reads are served locally while the replica is fresh; callers fall back to
+the products service when it is not (not yet synced, or the feed has been
+unreachable for longer than max_staleness). Stock mutations always go to
+the products service, which remains the source of truth.
+"""
+import threading
+import time
+import requests
+from django.conf import settings
+
+
+class ProductReplica:
+    def __init__(self, base_url, interval=2, max_staleness=10, page_size=500):
+        self.base_url = base_url
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.page_size = page_size
+        self.version = 0
+        self.synced_at = None
+        self._products = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def sync(self):
+        """Apply every change after the current version"""
+        while True:
+            response = requests.get(
+                f'{self.base_url}/api/products/changes',
+                params={'since': self.version, 'limit': self.page_size},
+                timeout=5
+            )
+            if response.status_code == 410:
+                # The feed was reset under us; rebuild from a full snapshot
+                with self._lock:
+                    self._products = {}
+                    self.version = 0
+                continue
+            response.raise_for_status()
+            page = response.json()
+            with self._lock:
+                for product in page['upserts']:
+                    self._products[product['id']] = product
+                for product_id in page['deletes']:
+                    self._products.pop(product_id, None)
+                self.version = page['version']
+            if not page['has_more']:
+                break
+        self.synced_at = time.monotonic()
+
+    def _poll(self):
+        while True:
+            try:
+                self.sync()
+            except (requests.RequestException, ValueError, KeyError) as e:
+                print(f'Product replica sync failed: {e}')
+            time.sleep(self.interval)
+
+    def start(self):
+        """Start polling in a daemon thread (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll, name='product-replica', daemon=True)
+                self._thread.start()
+
+    def is_fresh(self):
+        return self.synced_at is not None and time.monotonic() - self.synced_at <= self.max_staleness
+
+    def get_many(self, product_ids):
+        """
+        Products for the given ids from the replica, or {} if the replica is
+        not fresh. Ids the replica does not know are absent from the result.
+        """
+        self.start()
+        if not self.is_fresh():
+            return {}
+        with self._lock:
+            return {
+                product_id: self._products[product_id]
+                for product_id in product_ids if product_id in self._products
+            }
+
+
+replica = ProductReplica(
+    settings.PRODUCTS_SERVICE_URL,
+    interval=getattr(settings, 'PRODUCT_REPLICA_INTERVAL', 2),
+    max_staleness=getattr(settings, 'PRODUCT_REPLICA_MAX_STALENESS', 10)
+)
@@ -0,0 +1,25 @@
+import json
+from itertools import groupby
+from django.core.management.base import BaseCommand
+from orders_app.models import OrderItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the product ids of each order as NDJSON ({"order_id": ..., "product_ids": [...]}), '
+        'in increasing order id, for the products service build_related_products command'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after', type=int, default=0, help='Only export orders with a larger id')
+        parser.add_argument('--include-cancelled', action='store_true')
+
+    def handle(self, *args, **options):
+        items = OrderItem.objects.filter(order_id__gt=options['after'])
+        if not options['include_cancelled']:
+            items = items.exclude(order__status='cancelled')
+        rows = items.order_by('order_id', 'id').values_list('order_id', 'product_id').iterator(chunk_size=5000)
+
+        for order_id, group in groupby(rows, key=lambda row: row[0]):
+            product_ids = list(dict.fromkeys(product_id for _, product_id in group))
+            self.stdout.write(json.dumps({'order_id': order_id, 'product_ids': product_ids}))
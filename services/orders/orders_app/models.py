@@ -32,9 +32,13 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    @staticmethod
+    def new_order_number():
+        return f'ORD-{uuid.uuid4().hex[:12].upper()}'
+    
     def save(self, *args, **kwargs):
         if not self.order_number:
-            self.order_number = f'ORD-{uuid.uuid4().hex[:12].upper()}'
+            self.order_number = self.new_order_number()
         super().save(*args, **kwargs)
     
     class Meta:
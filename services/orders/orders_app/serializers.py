@@ -1,6 +1,17 @@
 from rest_framework import serializers
 from .models import Order, OrderItem
 
+
+class SparseFieldsMixin:
+    """Takes fields=[...] and drops every other field, so skipped fields are never computed"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
@@ -8,7 +19,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['subtotal']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     
     class Meta:
@@ -1,3 +1,97 @@
-from django.test import TestCase
+from unittest import mock
+import requests
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from . import views
+from .authentication import RemoteUser
+from .models import Order, OrderItem
 
-# Create your tests here.
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data or {}
+        self.text = ''
+
+    def json(self):
+        return self.data
+
+
+@override_settings(PRODUCT_REPLICA_ENABLED=False)
+class CreateOrderTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(RemoteUser({'id': 1, 'username': 'user', 'email': 'user@example.com', 'is_staff': False}))
+        self.adjustments = []
+
+        def get(url, params=None, headers=None, timeout=None):
+            if url.endswith('/api/cart'):
+                return FakeResponse(200, {'items': [{'product_id': 1, 'quantity': 2, 'price': '5.00'}]})
+            return FakeResponse(200, {'results': [{'id': 1, 'name': 'Pen', 'price': '5.00', 'stock': 10}]})
+
+        # Outcomes of successive stock adjustments: a status code, or an exception to raise
+        self.outcomes = []
+
+        def post(url, json=None, headers=None, timeout=None):
+            self.adjustments.append(json)
+            outcome = self.outcomes.pop(0) if self.outcomes else 200
+            if isinstance(outcome, Exception):
+                raise outcome
+            if outcome == 409:
+                return FakeResponse(409, {'results': [{'product_id': 1, 'delta': -2, 'error': 'Product not found'}]})
+            return FakeResponse(outcome, {})
+
+        for name, fake in (('get', get), ('post', post), ('delete', mock.Mock())):
+            patcher = mock.patch.object(views.requests, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_creates_order_and_reserves_stock(self):
+        response = self.client.post('/api/orders/create', {}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(OrderItem.objects.get().quantity, 2)
+        self.assertEqual(len(self.adjustments), 1)
+        self.assertEqual(self.adjustments[0]['reason'], 'order')
+        self.assertEqual(self.adjustments[0]['items'], [{'product_id': 1, 'delta': -2}])
+
+    def test_failed_insert_releases_reserved_stock(self):
+        with mock.patch.object(OrderItem.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            response = self.client.post('/api/orders/create', {}, format='json')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Order.objects.exists())
+        reserve, release = self.adjustments
+        self.assertEqual(release['reason'], 'cancel')
+        self.assertEqual(release['reference'], reserve['reference'])
+        self.assertEqual(release['items'], [{'product_id': 1, 'delta': 2}])
+
+    def test_reservation_is_retried_under_the_same_reference(self):
+        self.outcomes = [requests.Timeout('read timed out'), 200]
+
+        response = self.client.post('/api/orders/create', {}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        first, retry = self.adjustments
+        self.assertEqual((retry['reason'], retry['reference']), ('order', first['reference']))
+        self.assertEqual(Order.objects.get().order_number, first['reference'])
+
+    def test_unknown_reservation_outcome_releases_if_reserved(self):
+        self.outcomes = [requests.Timeout('read timed out'), requests.ConnectionError('refused')]
+
+        response = self.client.post('/api/orders/create', {}, format='json')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(Order.objects.exists())
+        release = self.adjustments[-1]
+        self.assertEqual((release['reason'], release['if_reserved']), ('cancel', True))
+        self.assertEqual(release['reference'], self.adjustments[0]['reference'])
+
+    def test_conflict_reports_the_item_error(self):
+        self.outcomes = [409]
+
+        response = self.client.post('/api/orders/create', {}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Pen: Product not found')
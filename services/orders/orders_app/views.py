@@ -1,11 +1,176 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.conf import settings
+from django.db import transaction
 from .models import Order, OrderItem
 from .serializers import OrderSerializer
+from .catalog_replica import replica
+
+# Matches the products service's batch lookup limit
+PRODUCTS_BATCH_SIZE = 100
+# All that checkout reads from a product
+PRODUCT_FIELDS = 'id,name,price,stock'
+ORDER_FIELDS = tuple(OrderSerializer.Meta.fields)
+ORDER_EXPANSIONS = ('items',)
+
+# Calls to other services that do not depend on each other run here; the
+# pool is shared, so its size caps concurrency across all requests
+downstream = ThreadPoolExecutor(
+    max_workers=settings.DOWNSTREAM_MAX_WORKERS,
+    thread_name_prefix='downstream'
+)
+
+
+def parse_order_fields(params):
+    """
+    Serializer fields for ?fields=a,b (None for all of them); ?expand=items
+    adds the order items. Raises ValueError for names orders do not have.
+    """
+    expand = [name.strip() for name in params.get('expand', '').split(',') if name.strip()]
+    unknown = [name for name in expand if name not in ORDER_EXPANSIONS]
+    if unknown:
+        raise ValueError(f'Cannot expand: {", ".join(unknown)}')
+    if not params.get('fields'):
+        return None
+
+    fields = list(dict.fromkeys(name.strip() for name in params['fields'].split(',') if name.strip()))
+    unknown = [name for name in fields if name not in ORDER_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    if 'items' in expand and 'items' not in fields:
+        fields.append('items')
+    return fields
+
+
+def select_order_fields(queryset, fields):
+    """Load only the columns behind the requested fields; fetch items only when returned"""
+    if fields is not None:
+        queryset = queryset.only('id', *[name for name in fields if name not in ('id', 'items')])
+    if fields is None or 'items' in fields:
+        queryset = queryset.prefetch_related('items')
+    return queryset
+
+
+def fetch_products(product_ids):
+    """
+    Fetch products from the local catalog replica, going to the products
+    service in batches of ids for anything the replica cannot answer.
+    Returns a dict of product_id -> product; ids that are missing or
+    could not be fetched are absent from the result.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    products = replica.get_many(product_ids) if settings.PRODUCT_REPLICA_ENABLED else {}
+    product_ids = [product_id for product_id in product_ids if product_id not in products]
+    chunks = [
+        product_ids[start:start + PRODUCTS_BATCH_SIZE]
+        for start in range(0, len(product_ids), PRODUCTS_BATCH_SIZE)
+    ]
+    # Batches are requested concurrently; a failed request raises here as before
+    for results in downstream.map(fetch_product_batch, chunks):
+        for product in results:
+            products[product['id']] = product
+    return products
+
+
+def fetch_product_batch(product_ids):
+    """One batch lookup against the products service; [] unless it answers 200"""
+    response = requests.get(
+        f'{settings.PRODUCTS_SERVICE_URL}/api/products/product',
+        params={'ids': ','.join(str(product_id) for product_id in product_ids), 'fields': PRODUCT_FIELDS},
+        timeout=5
+    )
+    if response.status_code != 200:
+        return []
+    return response.json()['results']
+
+
+def clear_cart(authorization):
+    """Empty the user's cart; the order stands whether or not this succeeds"""
+    try:
+        requests.delete(
+            f'{settings.CART_SERVICE_URL}/api/cart/clear',
+            headers={'Authorization': authorization},
+            timeout=5
+        )
+    except requests.RequestException as e:
+        print(f'Failed to clear cart: {e}')
+
+
+def adjust_stock(deltas, authorization, reason, reference, if_reserved=False):
+    """
+    Apply {product_id: delta} to product stock in one all-or-nothing call,
+    recorded in the inventory ledger under reason/reference. The products
+    service applies an order or cancel adjustment once per reference, so
+    repeating a call is safe. Returns the products service response.
+    """
+    return requests.post(
+        f'{settings.PRODUCTS_SERVICE_URL}/api/products/stock/adjust',
+        json={
+            'items': [{'product_id': product_id, 'delta': delta} for product_id, delta in deltas.items()],
+            'reason': reason,
+            'reference': reference,
+            'if_reserved': if_reserved,
+        },
+        headers={'Authorization': authorization},
+        timeout=5
+    )
+
+
+def reserve_stock(deltas, authorization, order_number):
+    """
+    Reserve stock under the order number. Returns the products service
+    response, or None if the outcome is unknown, after the reservation has
+    been released in case it was applied.
+    """
+    try:
+        return adjust_stock(deltas, authorization, 'order', order_number)
+    except requests.RequestException:
+        pass
+    # The call may have failed after the reservation was committed; asking
+    # again under the same reference either applies it or reports it applied
+    try:
+        return adjust_stock(deltas, authorization, 'order', order_number)
+    except requests.RequestException as e:
+        print(f'Failed to reserve stock for order {order_number}: {e}')
+    release_reservation(deltas, authorization, order_number)
+    return None
+
+
+def release_reservation(deltas, authorization, order_number):
+    """
+    Give back stock reserved for an order that was never recorded. Nothing
+    is given back if the reservation was never applied, and a reservation
+    still in flight is refused once this has been recorded.
+    """
+    try:
+        stock_response = adjust_stock(
+            {product_id: -delta for product_id, delta in deltas.items()},
+            authorization, 'cancel', order_number, if_reserved=True
+        )
+    except requests.RequestException as e:
+        print(f'Failed to release stock for order {order_number}: {e}')
+        return
+    if stock_response.status_code != 200:
+        print(f'Failed to release stock for order {order_number}: {stock_response.text}')
+
+
+def restore_stock(order, authorization):
+    """Return the stock of every item of an order in one call"""
+    deltas = {}
+    for item in order.items.all():
+        deltas[item.product_id] = deltas.get(item.product_id, 0) + item.quantity
+    if not deltas:
+        return
+    
+    stock_response = adjust_stock(deltas, authorization, 'cancel', order.order_number)
+    if stock_response.status_code != 200:
+        # Log error but don't fail the cancellation
+        print(f'Failed to restore stock for order {order.order_number}: {stock_response.text}')
+
 
 
 @api_view(['POST'])
@@ -30,23 +195,18 @@ def create_order(request):
         
         # Verify stock and get product details
         order_items_data = []
-        products_stock = {}
+        
+        products = fetch_products(item['product_id'] for item in cart_items)
         
         for item in cart_items:
-            product_response = requests.get(
-                f'{settings.PRODUCTS_SERVICE_URL}/api/products/product/{item["product_id"]}',
-                timeout=5
-            )
+            product = products.get(item['product_id'])
             
-            if product_response.status_code != 200:
+            if product is None:
                 return Response(
                     {'error': f'Product {item["product_id"]} not found'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            product = product_response.json()
-            products_stock[item['product_id']] = product['stock']
-            
             # Check stock
             if product['stock'] < item['quantity']:
                 return Response(
@@ -61,51 +221,64 @@ def create_order(request):
                 'price': float(item['price']),
             })
         
+        # Reserve stock for every item in one atomic adjustment
+        deltas = {}
+        for item_data in order_items_data:
+            deltas[item_data['product_id']] = deltas.get(item_data['product_id'], 0) - item_data['quantity']
+        
+        order_number = Order.new_order_number()
+        stock_response = reserve_stock(deltas, request.headers.get('Authorization'), order_number)
+        if stock_response is None:
+            return Response(
+                {'error': 'Products service unavailable, stock not reserved'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        if stock_response.status_code == 409:
+            errors = [
+                f'{products[failed["product_id"]]["name"]}: {failed["error"]}'
+                for failed in stock_response.json()['results']
+            ]
+            return Response({'error': '; '.join(errors)}, status=status.HTTP_400_BAD_REQUEST)
+        if stock_response.status_code != 200:
+            return Response({'error': 'Failed to reserve stock'}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Calculate totals
         subtotal = sum(item['price'] * item['quantity'] for item in order_items_data)
         tax = subtotal * 0.10
         total = subtotal + tax
         
-        # Create order
-        order = Order.objects.create(
-            user_id=request.user.id,
-            total_amount=total,
-            tax_amount=tax,
-            delivery_name=request.data.get('delivery_name', ''),
-            delivery_phone=request.data.get('delivery_phone', ''),
-            delivery_address=request.data.get('delivery_address', ''),
-            delivery_city=request.data.get('delivery_city', ''),
-            delivery_state=request.data.get('delivery_state', ''),
-            delivery_postal_code=request.data.get('delivery_postal_code', ''),
-            delivery_country=request.data.get('delivery_country', 'India'),
-            delivery_latitude=request.data.get('delivery_latitude'),
-            delivery_longitude=request.data.get('delivery_longitude'),
-            payment_method=request.data.get('payment_method', 'COD')
-        )
+        # The stock is taken now; if the order cannot be recorded, give it back
+        try:
+            with transaction.atomic():
+                # Create order
+                order = Order.objects.create(
+                    order_number=order_number,
+                    user_id=request.user.id,
+                    total_amount=total,
+                    tax_amount=tax,
+                    delivery_name=request.data.get('delivery_name', ''),
+                    delivery_phone=request.data.get('delivery_phone', ''),
+                    delivery_address=request.data.get('delivery_address', ''),
+                    delivery_city=request.data.get('delivery_city', ''),
+                    delivery_state=request.data.get('delivery_state', ''),
+                    delivery_postal_code=request.data.get('delivery_postal_code', ''),
+                    delivery_country=request.data.get('delivery_country', 'India'),
+                    delivery_latitude=request.data.get('delivery_latitude'),
+                    delivery_longitude=request.data.get('delivery_longitude'),
+                    payment_method=request.data.get('payment_method', 'COD')
+                )
+                
+                # Create order items in one INSERT (bulk_create skips save(), so set subtotal here)
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, subtotal=item_data['quantity'] * item_data['price'], **item_data)
+                    for item_data in order_items_data
+                ])
+        except Exception:
+            release_reservation(deltas, request.headers.get('Authorization'), order_number)
+            raise
         
-        # Create order items and update product stock
-        for item_data in order_items_data:
-            OrderItem.objects.create(order=order, **item_data)
-            
-            # Update product stock using dedicated endpoint
-            new_stock = products_stock[item_data['product_id']] - item_data['quantity']
-            stock_response = requests.put(
-                f'{settings.PRODUCTS_SERVICE_URL}/api/products/product/{item_data["product_id"]}/stock',
-                json={'stock': new_stock},
-                headers={'Authorization': request.headers.get('Authorization')},
-                timeout=5
-            )
-            
-            if stock_response.status_code not in [200, 201]:
-                # Log error but don't fail the order
-                print(f'Failed to update stock for product {item_data["product_id"]}: {stock_response.text}')
-        
-        # Clear cart
-        requests.delete(
-            f'{settings.CART_SERVICE_URL}/api/cart/clear',
-            headers={'Authorization': request.headers.get('Authorization')},
-            timeout=5
-        )
+        # Clear the cart off the request path; a failure there must not fail the order
+        downstream.submit(clear_cart, request.headers.get('Authorization'))
         
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -117,19 +290,29 @@ def create_order(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_orders(request):
-    """Get user's orders"""
-    orders = Order.objects.filter(user_id=request.user.id)
-    serializer = OrderSerializer(orders, many=True)
+    """Get user's orders; ?fields= and ?expand=items select what is returned"""
+    try:
+        fields = parse_order_fields(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    orders = select_order_fields(Order.objects.filter(user_id=request.user.id), fields)
+    serializer = OrderSerializer(orders, many=True, fields=fields)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_order_detail(request, order_id):
-    """Get order details"""
+    """Get order details; ?fields= and ?expand=items select what is returned"""
     try:
-        order = Order.objects.get(id=order_id, user_id=request.user.id)
-        serializer = OrderSerializer(order)
+        fields = parse_order_fields(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        order = select_order_fields(Order.objects.all(), fields).get(id=order_id, user_id=request.user.id)
+        serializer = OrderSerializer(order, fields=fields)
         return Response(serializer.data, status=status.HTTP_200_OK)
     except Order.DoesNotExist:
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -149,21 +332,7 @@ def cancel_order(request, order_id):
             )
         
         # Restore stock for cancelled order
-        for item in order.items.all():
-            product_response = requests.get(
-                f'{settings.PRODUCTS_SERVICE_URL}/api/products/product/{item.product_id}',
-                timeout=5
-            )
-            
-            if product_response.status_code == 200:
-                product = product_response.json()
-                new_stock = product['stock'] + item.quantity
-                requests.put(
-                    f'{settings.PRODUCTS_SERVICE_URL}/api/products/product/{item.product_id}/stock',
-                    json={'stock': new_stock},
-                    headers={'Authorization': request.headers.get('Authorization')},
-                    timeout=5
-                )
+        restore_stock(order, request.headers.get('Authorization'))
         
         order.status = 'cancelled'
         order.save()
@@ -177,12 +346,17 @@ def cancel_order(request, order_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_all_orders(request):
-    """Get all orders (admin only)"""
+    """Get all orders (admin only); ?fields= and ?expand=items select what is returned"""
     if not request.user.is_staff:
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
-    orders = Order.objects.all()
-    serializer = OrderSerializer(orders, many=True)
+    try:
+        fields = parse_order_fields(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    orders = select_order_fields(Order.objects.all(), fields)
+    serializer = OrderSerializer(orders, many=True, fields=fields)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -203,21 +377,7 @@ def update_order_status(request, order_id):
         
         # If changing to cancelled, restore stock
         if new_status == 'cancelled' and old_status != 'cancelled':
-            for item in order.items.all():
-                product_response = requests.get(
-                    f'{settings.PRODUCTS_SERVICE_URL}/api/products/product/{item.product_id}',
-                    timeout=5
-                )
-                
-                if product_response.status_code == 200:
-                    product = product_response.json()
-                    new_stock = product['stock'] + item.quantity
-                    requests.put(
-                        f'{settings.PRODUCTS_SERVICE_URL}/api/products/product/{item.product_id}/stock',
-                        json={'stock': new_stock},
-                        headers={'Authorization': request.headers.get('Authorization')},
-                        timeout=5
-                    )
+            restore_stock(order, request.headers.get('Authorization'))
         
         order.status = new_status
         order.save()
@@ -142,3 +142,10 @@ CORS_ALLOW_CREDENTIALS = True
 AUTH_SERVICE_URL = os.getenv('AUTH_SERVICE_URL', 'http://localhost:8000')
 CART_SERVICE_URL = os.getenv('CART_SERVICE_URL', 'http://localhost:8002')
 PRODUCTS_SERVICE_URL = os.getenv('PRODUCTS_SERVICE_URL', 'http://localhost:8001')
+# Cap on concurrent calls to other services, shared by all requests of a process
+DOWNSTREAM_MAX_WORKERS = int(os.getenv('DOWNSTREAM_MAX_WORKERS', '8'))
+
+# Local product replica fed by the products service change feed
+PRODUCT_REPLICA_ENABLED = os.getenv('PRODUCT_REPLICA_ENABLED', 'True') == 'True'
+PRODUCT_REPLICA_INTERVAL = 2
+PRODUCT_REPLICA_MAX_STALENESS = 10
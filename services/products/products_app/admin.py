@@ -4,7 +4,7 @@ from .models import Category, Product
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'created_at', 'updated_at']
+    list_display = ['id', 'name', 'parent', 'product_count', 'in_stock_count', 'stock_value', 'created_at', 'updated_at']
     search_fields = ['name']
     ordering = ['-created_at']
 
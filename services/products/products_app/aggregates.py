@@ -0,0 +1,103 @@
+"""
+Denormalized per-category aggregates: product count, in-stock product
+count and stock value (sum of price * stock).
+
+Single-product writes apply deltas with F() updates; bulk paths recompute
+the touched categories with one GROUP BY query. reconcile_categories()
+rebuilds everything from scratch.
+
+Every stock change therefore also updates its category row. On SQLite that
+costs nothing extra, since a write already holds the database lock; on a
+row-locking database, writers to products of one category serialize on that
+row until they commit. stock_adjusted() applies one update per category, not
+per product, so a multi-item adjustment takes each category lock once.
+"""
+from decimal import Decimal
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.utils import timezone
+from .models import Category, Product
+from .detail_cache import evict_categories
+
+
+def contribution(price, stock):
+    """(product_count, in_stock_count, stock_value) contributed by one product"""
+    stock = int(stock)
+    return 1, 1 if stock > 0 else 0, Decimal(str(price)) * stock
+
+
+def apply_delta(category_id, count=0, in_stock=0, value=Decimal('0')):
+    """Shift a category's aggregates by the given amounts"""
+    if not (count or in_stock or value):
+        return
+    # updated_at moves too, so category ETags and caches see the change
+    Category.objects.filter(id=category_id).update(
+        product_count=F('product_count') + count,
+        in_stock_count=F('in_stock_count') + in_stock,
+        stock_value=F('stock_value') + value,
+        updated_at=timezone.now()
+    )
+    evict_categories([category_id])
+
+
+def product_changed(previous, current):
+    """
+    Apply the difference between two (category_id, price, stock) states;
+    either side may be None for a create or a delete.
+    """
+    if previous and current and previous[0] == current[0]:
+        old, new = contribution(*previous[1:]), contribution(*current[1:])
+        apply_delta(current[0], 0, new[1] - old[1], new[2] - old[2])
+        return
+    if previous:
+        count, in_stock, value = contribution(*previous[1:])
+        apply_delta(previous[0], -count, -in_stock, -value)
+    if current:
+        apply_delta(current[0], *contribution(*current[1:]))
+
+
+def stock_adjusted(rows, deltas):
+    """
+    Apply aggregate changes for set-based stock updates.
+    rows: (product_id, category_id, price, new_stock) read after the update;
+    deltas: {product_id: total delta applied}.
+    """
+    totals = {}
+    for product_id, category_id, price, stock in rows:
+        old, new = contribution(price, stock - deltas[product_id]), contribution(price, stock)
+        in_stock, value = totals.get(category_id, (0, Decimal('0')))
+        totals[category_id] = (in_stock + new[1] - old[1], value + new[2] - old[2])
+    for category_id, (in_stock, value) in totals.items():
+        apply_delta(category_id, 0, in_stock, value)
+
+
+def recompute_categories(category_ids=None):
+    """Recompute aggregates for the given categories (all if None) from the products table"""
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(id__in=category_ids)
+
+    totals = {
+        row['category_id']: row
+        for row in Product.objects.filter(category__in=categories)
+        .values('category_id')
+        .annotate(
+            count=Count('id'),
+            in_stock=Count('id', filter=Q(stock__gt=0)),
+            value=Sum(F('price') * F('stock'), output_field=DecimalField()),
+        )
+    }
+
+    changed = []
+    for category in categories.only('id', 'name', 'product_count', 'in_stock_count', 'stock_value'):
+        row = totals.get(category.id, {})
+        values = (row.get('count', 0), row.get('in_stock', 0), Decimal(row.get('value') or 0).quantize(Decimal('0.01')))
+        if values != (category.product_count, category.in_stock_count, category.stock_value):
+            category.product_count, category.in_stock_count, category.stock_value = values
+            category.updated_at = timezone.now()
+            changed.append(category)
+
+    Category.objects.bulk_update(
+        changed, ['product_count', 'in_stock_count', 'stock_value', 'updated_at'], batch_size=500
+    )
+    evict_categories(category.id for category in changed)
+    return changed
@@ -0,0 +1,255 @@
+"""
+Set-based product updates.
+
+Two forms, both applied in one transaction with the follow-up work done once
+per batch rather than once per row:
+
+- a list of partial updates, [{"id": 1, "price": "9.99"}, ...], written with
+  a single bulk_update();
+- a listing filter plus per-field expressions, e.g. {"filter": {"category_id":
+  4}, "update": {"price": {"multiply": "0.9"}}}, written as one UPDATE per
+  chunk of products.
+
+Stock changes are recorded in the inventory ledger, category aggregates of
+every touched category are recomputed with one query, and the search index,
+suggestions, change feed and caches are refreshed for the affected products.
+"""
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Round
+from django.http import QueryDict
+from django.utils import timezone
+from .models import Category, Product
+from .filters import InvalidFilter, filter_products, parse_filters, visible_categories, visible_products
+from .aggregates import recompute_categories
+from .catalog_cache import invalidate_catalog
+from .changes import record_changes
+from .detail_cache import evict_products
+from .inventory import record_movements
+from . import search
+from . import sharding
+from . import suggest
+
+MAX_BULK_UPDATES = 1000
+# Ids per statement, well under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+# field -> operations allowed in the expression form
+EXPRESSION_OPS = {
+    'price': ('set', 'multiply', 'add'),
+    'stock': ('set', 'add'),
+    'category': ('set',),
+}
+STATE_FIELDS = ('id', 'name', 'description', 'category_id', 'price', 'stock')
+
+
+class InvalidBulkUpdate(ValueError):
+    """Raised when a bulk update request cannot be applied"""
+
+
+def _number(value, field):
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise InvalidBulkUpdate(f'{field} must be a number.')
+
+
+def parse_expressions(update):
+    """Turn {"price": {"multiply": "0.9"}, ...} into {column: expression}"""
+    if not isinstance(update, dict) or not update:
+        raise InvalidBulkUpdate('update must be a non-empty object.')
+
+    expressions = {}
+    for field, spec in update.items():
+        if field not in EXPRESSION_OPS:
+            raise InvalidBulkUpdate(f'{field} cannot be updated by expression.')
+        if not isinstance(spec, dict) or len(spec) != 1:
+            raise InvalidBulkUpdate(f'{field} needs exactly one of: {", ".join(EXPRESSION_OPS[field])}.')
+        (op, value), = spec.items()
+        if op not in EXPRESSION_OPS[field]:
+            raise InvalidBulkUpdate(f'{field} supports: {", ".join(EXPRESSION_OPS[field])}.')
+
+        if field == 'price':
+            value = _number(value, 'price')
+            if op == 'set':
+                expressions['price'] = Value(value.quantize(Decimal('0.01')))
+            elif op == 'multiply':
+                if value <= 0:
+                    raise InvalidBulkUpdate('price multiplier must be positive.')
+                expressions['price'] = Round(F('price') * value, 2)
+            else:
+                expressions['price'] = F('price') + value.quantize(Decimal('0.01'))
+        elif field == 'stock':
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise InvalidBulkUpdate('stock must be an integer.')
+            expressions['stock'] = Value(value) if op == 'set' else F('stock') + value
+        else:
+            if isinstance(value, bool):
+                raise InvalidBulkUpdate('category must be a category id.')
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise InvalidBulkUpdate('category must be a category id.')
+            if not visible_categories().filter(id=value).exists():
+                raise InvalidBulkUpdate(f'Unknown category: {value}')
+            expressions['category_id'] = Value(value)
+    return expressions
+
+
+def parse_filter(data):
+    """Parse a listing-style filter object; an empty filter is refused"""
+    if not isinstance(data, dict):
+        raise InvalidBulkUpdate('filter must be an object.')
+    params = QueryDict(mutable=True)
+    for key, value in data.items():
+        values = value if isinstance(value, list) else [value]
+        params.setlist(key, ['true' if v is True else str(v) for v in values])
+    try:
+        filters = parse_filters(params)
+    except InvalidFilter as e:
+        raise InvalidBulkUpdate(str(e))
+
+    ids = []
+    for value in params.getlist('ids'):
+        for part in value.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                raise InvalidBulkUpdate(f'Invalid product id: {part}')
+            ids.append(int(part))
+    if not (ids or filters['category_ids'] or filters['min_price'] is not None
+            or filters['max_price'] is not None or filters['in_stock']):
+        raise InvalidBulkUpdate('filter must restrict the products to update.')
+    queryset = filter_products(filters)
+    if ids:
+        queryset = queryset.filter(id__in=ids)
+    return queryset
+
+
+def _chunks(product_ids):
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), CHUNK_SIZE):
+        yield product_ids[start:start + CHUNK_SIZE]
+
+
+def _state(product_ids):
+    """{id: (id, name, description, category_id, price, stock)}"""
+    state = {}
+    for chunk in _chunks(product_ids):
+        state.update(
+            (row[0], row) for row in Product.objects.filter(id__in=chunk).values_list(*STATE_FIELDS)
+        )
+    return state
+
+
+def _finish(before, reference):
+    """Bring every derived structure in line after the products in `before` changed"""
+    product_ids = list(before)
+    after = _state(product_ids)
+
+    sharded = set()
+    for chunk in _chunks(product_ids):
+        sharded |= sharding.sharded_ids(chunk)
+    for product_id in sharded:
+        if after[product_id][5] != before[product_id][5]:
+            sharding.reset_stock(product_id, after[product_id][5])
+
+    categories = {row[3] for row in before.values()} | {row[3] for row in after.values()}
+    recompute_categories(categories)
+
+    record_movements(
+        [
+            (product_id, row[5] - before[product_id][5], row[5])
+            for product_id, row in after.items()
+        ],
+        'adjust',
+        reference
+    )
+
+    renamed = [
+        row for product_id, row in after.items()
+        if row[1:4] != before[product_id][1:4]
+    ]
+    if renamed:
+        category_names = dict(Category.objects.filter(id__in={row[3] for row in renamed}).values_list('id', 'name'))
+        search.index_rows((row[0], row[1], row[2], category_names[row[3]]) for row in renamed)
+        suggest.products_saved((row[0], row[1], row[3]) for row in renamed)
+
+    record_changes(product_ids)
+    evict_products(product_ids)
+    transaction.on_commit(invalidate_catalog)
+    return after
+
+
+def apply_updates(updates, reference=''):
+    """
+    Apply validated partial updates ({'id': ..., field: value, ...}) with a
+    single bulk_update. Returns (updated_count, missing_ids).
+    """
+    if len(updates) > MAX_BULK_UPDATES:
+        raise InvalidBulkUpdate(f'At most {MAX_BULK_UPDATES} products can be updated at once.')
+    by_id = {}
+    for update in updates:
+        by_id.setdefault(update['id'], {}).update(update)
+
+    category_ids = {update['category'] for update in by_id.values() if 'category' in update}
+    unknown = category_ids - set(visible_categories().filter(id__in=category_ids).values_list('id', flat=True))
+    if unknown:
+        raise InvalidBulkUpdate(f'Unknown category: {", ".join(map(str, sorted(unknown)))}')
+
+    with transaction.atomic():
+        if any('stock' in update for update in by_id.values()):
+            sharding.sync_stock(sharding.sharded_ids(by_id))
+        products = visible_products().in_bulk(list(by_id))
+        before = _state(products)
+
+        now = timezone.now()
+        fields = {'updated_at'}
+        for product_id, product in products.items():
+            for field, value in by_id[product_id].items():
+                if field == 'id':
+                    continue
+                if field == 'category':
+                    product.category_id = value
+                else:
+                    setattr(product, field, value)
+                fields.add(field)
+            product.updated_at = now
+        Product.objects.bulk_update(products.values(), sorted(fields), batch_size=500)
+        if products:
+            _finish(before, reference)
+
+    return len(products), [product_id for product_id in by_id if product_id not in products]
+
+
+def apply_expression(queryset, expressions, reference=''):
+    """
+    Apply {column: expression} to every product in the queryset, one UPDATE
+    statement per CHUNK_SIZE products. Refuses, changing nothing, if the
+    update takes a price or stock that was not negative below zero. Returns
+    the number of products updated.
+    """
+    with transaction.atomic():
+        product_ids = list(queryset.values_list('id', flat=True))
+        if not product_ids:
+            return 0
+        if 'stock' in expressions:
+            for chunk in _chunks(product_ids):
+                sharding.sync_stock(sharding.sharded_ids(chunk))
+        before = _state(product_ids)
+
+        # Rows already negative (e.g. oversold stock) do not block an update
+        # of other columns; only values this update takes below zero do
+        guarded = [field for field in ('price', 'stock') if field in expressions]
+        now = timezone.now()
+        updated = 0
+        for chunk in _chunks(product_ids):
+            updated += Product.objects.filter(id__in=chunk).update(**expressions, updated_at=now)
+            for field in guarded:
+                column = STATE_FIELDS.index(field)
+                negative = Product.objects.filter(id__in=chunk, **{f'{field}__lt': 0}).values_list('id', flat=True)
+                if any(before[product_id][column] >= 0 for product_id in negative):
+                    raise InvalidBulkUpdate(f'The update would make a {field} negative.')
+        _finish(before, reference)
+    return updated
@@ -0,0 +1,120 @@
+"""
+Response cache for anonymous catalog reads.
+
+Entries live in Django's cache framework under a key that embeds a catalog
+version number; any Product/Category write bumps the version, which
+invalidates every cached response at once. Rebuilds after an invalidation
+are single-flight: one request recomputes while concurrent requests for the
+same key wait for its result.
+"""
+import time
+from datetime import datetime, timezone
+from hashlib import sha1
+from django.core.cache import cache
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from .conditional import not_modified_response, set_validators
+
+VERSION_KEY = 'catalog:version'
+STATS_KEYS = {
+    'hits': 'catalog:stats:hits',
+    'misses': 'catalog:stats:misses',
+    'coalesced': 'catalog:stats:coalesced',
+}
+ENTRY_TIMEOUT = 300
+LOCK_TIMEOUT = 10
+WAIT_TIMEOUT = 5
+POLL_INTERVAL = 0.02
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def catalog_version():
+    """Current catalog version; seeded from the clock so a lost key never reuses old entries"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_catalog():
+    """Invalidate every cached catalog response"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def cache_stats():
+    """Hit/miss counters plus the current catalog version"""
+    stats = {name: cache.get(key, 0) for name, key in STATS_KEYS.items()}
+    stats['version'] = catalog_version()
+    return stats
+
+
+def _entry_key(request, namespace):
+    url_hash = sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f'catalog:{catalog_version()}:{namespace}:{url_hash}'
+
+
+def _store(key, response):
+    """Cache a successful response together with its validators"""
+    if response.status_code != status.HTTP_200_OK or 'ETag' not in response:
+        return
+    last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+    cache.set(key, {
+        'data': response.data,
+        'etag': response['ETag'],
+        'last_modified': datetime.fromtimestamp(last_modified, tz=timezone.utc) if last_modified else None,
+    }, timeout=ENTRY_TIMEOUT)
+
+
+def _replay(request, entry):
+    """Rebuild a response (or a 304) from a cache entry"""
+    response = not_modified_response(request, entry['etag'], entry['last_modified'])
+    if response is None:
+        response = Response(entry['data'], status=status.HTTP_200_OK)
+    return set_validators(response, entry['etag'], entry['last_modified'])
+
+
+def cached_response(request, namespace, build):
+    """
+    Serve a GET from the catalog cache, calling build() to produce the
+    response on a miss. Only 200 responses carrying an ETag are stored.
+    """
+    key = _entry_key(request, namespace)
+    entry = cache.get(key)
+    if entry is not None:
+        _incr(STATS_KEYS['hits'])
+        return _replay(request, entry)
+
+    lock_key = f'{key}:lock'
+    acquired = cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)
+    if not acquired:
+        # Another request is rebuilding this entry; wait for its result
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                _incr(STATS_KEYS['coalesced'])
+                return _replay(request, entry)
+            if cache.get(lock_key) is None:
+                break
+
+    _incr(STATS_KEYS['misses'])
+    try:
+        response = build()
+        _store(key, response)
+    finally:
+        if acquired:
+            cache.delete(lock_key)
+    return response
@@ -0,0 +1,131 @@
+"""
+Background category deletion.
+
+category.delete() cascades through the ORM: every product of the category is
+loaded into memory and deleted, with its signal handlers, inside one
+transaction that holds the SQLite write lock until the last row is gone.
+
+start_deletion() instead marks the category `deleting`, which hides it and
+its products from every read path at once, and queues a CategoryDeletion
+job. The job removes the products in batches of BATCH_SIZE, each batch a
+short transaction of set-based deletes that also updates the search index,
+change feed and job progress, then releases the images no remaining product
+uses. It pauses between batches so other writers get the lock, and
+deletes the now empty category last. A failed or stalled job is resumed by
+issuing the DELETE again.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from .models import Category, CategoryDeletion, Product, StockShard
+from .catalog_cache import invalidate_catalog
+from .changes import record_changes
+from .detail_cache import evict_categories, evict_products
+from .images import release_images
+from . import search
+from . import suggest
+
+# Products per transaction, well under SQLite's bound-parameter limit
+BATCH_SIZE = getattr(settings, 'CATEGORY_DELETE_BATCH_SIZE', 500)
+# Seconds between batches, leaving the write lock to request threads
+BATCH_PAUSE = getattr(settings, 'CATEGORY_DELETE_PAUSE', 0.05)
+# A job that has not reported progress for this long is presumed dead
+STALE_AFTER = timedelta(minutes=5)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='category-deletion')
+
+
+def _resumable(job):
+    return job.status == 'failed' or job.updated_at < timezone.now() - STALE_AFTER
+
+
+def start_deletion(category):
+    """
+    Hide the category and queue the deletion of its products. Returns the
+    category's CategoryDeletion job; an unfinished job is reused, and
+    resubmitted if it failed or stalled.
+    """
+    with transaction.atomic():
+        job = CategoryDeletion.objects.filter(category_id=category.id).exclude(status='done').first()
+        if job is None:
+            # update() skips the save signals, which would touch every product
+            Category.objects.filter(id=category.id).update(deleting=True, updated_at=timezone.now())
+            job = CategoryDeletion.objects.create(
+                category_id=category.id,
+                category_name=category.name,
+                total=category.product_count
+            )
+            evict_categories([category.id])
+            suggest.category_deleted(category.id)
+            transaction.on_commit(invalidate_catalog)
+        elif not _resumable(job):
+            return job
+
+        job_id = job.id
+        transaction.on_commit(lambda: _executor.submit(run_deletion, job_id))
+    return job
+
+
+def delete_batch(category_id, batch_size=BATCH_SIZE):
+    """
+    Delete up to batch_size products of the category with set-based
+    statements. Run inside a transaction. Returns (deleted count, image
+    names of the deleted products).
+    """
+    rows = list(
+        Product.objects.filter(category_id=category_id).order_by('id').values_list('id', 'image')[:batch_size]
+    )
+    if not rows:
+        return 0, []
+    product_ids = [product_id for product_id, _ in rows]
+
+    StockShard.objects.filter(product_id__in=product_ids).delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {Product._meta.db_table} WHERE id IN ({", ".join(["%s"] * len(product_ids))})',
+            product_ids
+        )
+        deleted = cursor.rowcount
+    search.remove_products(product_ids)
+    record_changes(product_ids, 'delete')
+    evict_products(product_ids)
+    return deleted, [image for _, image in rows if image]
+
+
+def run_deletion(job_id):
+    """Delete a category's products batch by batch, then the category itself"""
+    close_old_connections()
+    try:
+        job = CategoryDeletion.objects.get(id=job_id)
+        if job.status == 'done':
+            return
+        job.status = 'running'
+        job.error = ''
+        job.save(update_fields=['status', 'error', 'updated_at'])
+
+        while True:
+            with transaction.atomic():
+                deleted, images = delete_batch(job.category_id)
+                if not deleted:
+                    break
+                job.deleted += deleted
+                job.save(update_fields=['deleted', 'updated_at'])
+            release_images(images)
+            time.sleep(BATCH_PAUSE)
+
+        with transaction.atomic():
+            # Empty by now, so the cascade has nothing left to load
+            category = Category.objects.filter(id=job.category_id).first()
+            if category is not None:
+                category.delete()
+            job.status = 'done'
+            job.save(update_fields=['status', 'updated_at'])
+    except Exception as e:
+        CategoryDeletion.objects.filter(id=job_id).update(
+            status='failed', error=str(e), updated_at=timezone.now()
+        )
+    finally:
+        connection.close()
@@ -0,0 +1,94 @@
+"""
+Category hierarchy stored as a closure table.
+
+CategoryClosure holds a row for every (ancestor, descendant) pair, each
+category being its own ancestor at depth 0. "Everything under X" is then a
+single indexed lookup on ancestor, usable as a subquery in product filters,
+and subtree aggregates are one GROUP BY over the closure joined to the
+per-category aggregates, with no recursion at read time.
+
+The signal handlers call add_category() when a category is created and
+move_category() when its parent changes; rebuild_closure() recreates the
+table from the parent links.
+"""
+from django.db import connection
+from django.db.models import Sum
+from .models import Category, CategoryClosure
+
+
+def add_category(category_id, parent_id):
+    """Insert the closure rows of a new leaf category"""
+    rows = [CategoryClosure(ancestor_id=category_id, descendant_id=category_id, depth=0)]
+    if parent_id is not None:
+        rows += [
+            CategoryClosure(ancestor_id=ancestor_id, descendant_id=category_id, depth=depth + 1)
+            for ancestor_id, depth in CategoryClosure.objects.filter(descendant_id=parent_id)
+            .values_list('ancestor_id', 'depth')
+        ]
+    CategoryClosure.objects.bulk_create(rows)
+
+
+def move_category(category_id, parent_id):
+    """Re-attach a category and its whole subtree under parent_id (None for a root)"""
+    table = CategoryClosure._meta.db_table
+    with connection.cursor() as cursor:
+        # Detach the subtree from the ancestors it had outside itself
+        cursor.execute(
+            f'DELETE FROM {table} '
+            f'WHERE descendant_id IN (SELECT descendant_id FROM {table} WHERE ancestor_id = %s) '
+            f'AND ancestor_id NOT IN (SELECT descendant_id FROM {table} WHERE ancestor_id = %s)',
+            [category_id, category_id]
+        )
+        if parent_id is not None:
+            # Every ancestor of the new parent becomes an ancestor of every node in the subtree
+            cursor.execute(
+                f'INSERT INTO {table} (ancestor_id, descendant_id, depth) '
+                f'SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1 '
+                f'FROM {table} above, {table} below '
+                f'WHERE above.descendant_id = %s AND below.ancestor_id = %s',
+                [parent_id, category_id]
+            )
+
+
+def is_in_subtree(category_id, root_id):
+    """True if category_id is root_id or one of its descendants"""
+    return CategoryClosure.objects.filter(ancestor_id=root_id, descendant_id=category_id).exists()
+
+
+def subtree_ids(category_ids):
+    """Subquery of the ids of the given categories and all their descendants"""
+    return CategoryClosure.objects.filter(ancestor_id__in=category_ids).values('descendant_id')
+
+
+def subtree_totals(category_ids=None):
+    """
+    {category_id: {'subtree_product_count', 'subtree_in_stock_count',
+    'subtree_stock_value'}} summed over each category and its descendants,
+    for the given categories (all if None). Categories being deleted are left out.
+    """
+    closure = CategoryClosure.objects.filter(descendant__deleting=False)
+    if category_ids is not None:
+        closure = closure.filter(ancestor_id__in=category_ids)
+    return {
+        row.pop('ancestor_id'): row
+        for row in closure.values('ancestor_id').annotate(
+            subtree_product_count=Sum('descendant__product_count'),
+            subtree_in_stock_count=Sum('descendant__in_stock_count'),
+            subtree_stock_value=Sum('descendant__stock_value'),
+        ).order_by()
+    }
+
+
+def rebuild_closure():
+    """Recreate the closure table from the parent links; returns the number of rows written"""
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    rows = []
+    for category_id in parents:
+        ancestor_id, depth = category_id, 0
+        # The depth bound stops a corrupt parent cycle from looping forever
+        while ancestor_id is not None and depth <= len(parents):
+            rows.append(CategoryClosure(ancestor_id=ancestor_id, descendant_id=category_id, depth=depth))
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    CategoryClosure.objects.all().delete()
+    CategoryClosure.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,66 @@
+"""
+Catalog change feed.
+
+Product writes record a CatalogChange row in the same transaction. Its id is
+a monotonically increasing version: a consumer that has applied everything
+up to version N asks for changes after N and gets the current state of every
+product changed since, plus the ids of deleted ones. Each product keeps only
+its latest change row, so reading the feed from version 0 yields a full
+snapshot of the catalog.
+"""
+from django.db.models import Max
+from .fast_serializers import product_rows, serialize_product_rows
+from .filters import visible_products
+from .models import CatalogChange, Product
+
+RECORD_BATCH_SIZE = 500
+
+
+class FeedReset(Exception):
+    """The consumer's version is ahead of the feed; it must resync from 0"""
+
+
+def record_changes(product_ids, op='upsert'):
+    """Move the given products to the head of the feed"""
+    product_ids = list(dict.fromkeys(product_ids))
+    for start in range(0, len(product_ids), RECORD_BATCH_SIZE):
+        batch = product_ids[start:start + RECORD_BATCH_SIZE]
+        CatalogChange.objects.filter(product_id__in=batch).delete()
+        CatalogChange.objects.bulk_create([CatalogChange(product_id=product_id, op=op) for product_id in batch])
+
+
+def record_category_products(category_id):
+    """A category change alters the category_name of every product in it"""
+    record_changes(Product.objects.filter(category_id=category_id).values_list('id', flat=True))
+
+
+def current_version():
+    return CatalogChange.objects.aggregate(version=Max('id'))['version'] or 0
+
+
+def changes_since(since, limit, request=None):
+    """
+    Up to `limit` changes after version `since`, as
+    {'version', 'has_more', 'upserts': [product, ...], 'deletes': [id, ...]}.
+    Raises FeedReset if `since` is newer than anything the feed has recorded.
+    """
+    rows = list(
+        CatalogChange.objects.filter(id__gt=since).order_by('id').values_list('id', 'product_id', 'op')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        version = current_version()
+        if since > version:
+            raise FeedReset()
+        return {'version': since, 'has_more': False, 'upserts': [], 'deletes': []}
+
+    upsert_ids = [product_id for _, product_id, op in rows if op == 'upsert']
+    upserts = serialize_product_rows(
+        product_rows(visible_products().filter(id__in=upsert_ids).order_by('id')), request
+    )
+    # A product deleted (or hidden by a category deletion) after its upsert
+    # was read shows up as a delete here; its tombstone follows later in the feed
+    found = {product['id'] for product in upserts}
+    deletes = [product_id for _, product_id, op in rows if op == 'delete' or product_id not in found]
+    return {'version': rows[-1][0], 'has_more': has_more, 'upserts': upserts, 'deletes': deletes}
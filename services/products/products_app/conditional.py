@@ -0,0 +1,50 @@
+"""
+Conditional GET support for catalog reads.
+
+Validators are derived from updated_at timestamps and row counts, so they
+can be checked with a single aggregate query before anything is serialized.
+"""
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_validators(*parts, last_modified=None):
+    """Build a strong ETag from the given parts plus an optional Last-Modified datetime"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest), last_modified
+
+
+def queryset_validators(request, queryset, *related_timestamps):
+    """
+    Validators for a listing: max(updated_at) and row count of the queryset,
+    plus the max of any related updated_at lookups (e.g. 'category__updated_at'),
+    scoped to the full request URL so filters and pages get distinct tags.
+    """
+    aggregates = {'count': Count('id'), 'updated': Max('updated_at')}
+    for i, lookup in enumerate(related_timestamps):
+        aggregates[f'related_{i}'] = Max(lookup)
+    values = queryset.order_by().aggregate(**aggregates)
+
+    timestamps = [value for key, value in values.items() if key != 'count' and value is not None]
+    last_modified = max(timestamps) if timestamps else None
+    parts = [request.build_absolute_uri(), values['count']]
+    parts += [values[key] for key in aggregates if key != 'count']
+    return make_validators(*parts, last_modified=last_modified)
+
+
+def not_modified_response(request, etag, last_modified):
+    """Return a 304 response if the client's validators still match, else None"""
+    # HTTP dates have second precision
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified):
+    """Attach ETag / Last-Modified and force clients to revalidate"""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,148 @@
+"""
+In-process cache of hot product detail payloads.
+
+A small LRU with a TTL, holding serialized ProductDetailSerializer output.
+Product payloads and the nested category payloads are cached separately, so
+a write to one product (or to the aggregates of its category) evicts only
+the entries it affects instead of the whole catalog. Each worker process
+keeps its own cache; writes made by another process are picked up within
+the TTL.
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+from django.conf import settings
+from django.db import transaction
+from .fast_serializers import image_url_prefix
+from .models import Product
+from .filters import visible_categories, visible_products
+from .serializers import CategorySerializer, ProductDetailSerializer
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+detail_cache = LRUCache(
+    max_entries=getattr(settings, 'PRODUCT_DETAIL_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'PRODUCT_DETAIL_CACHE_TTL', 30)
+)
+
+
+def _category_entry(category_id):
+    entry = detail_cache.get(('category', category_id))
+    if entry is None:
+        category = visible_categories().filter(id=category_id).first()
+        if category is None:
+            return None
+        entry = {'data': CategorySerializer(category).data, 'updated_at': category.updated_at}
+        detail_cache.set(('category', category_id), entry)
+    return entry
+
+
+def cached_product_detail(request, product_id):
+    """
+    (ProductDetailSerializer data, product updated_at, category updated_at)
+    for a product, or None if it does not exist. A warm entry is served
+    without touching the database.
+    """
+    prefix = image_url_prefix(request)
+    entry = detail_cache.get(('product', product_id))
+    if entry is None or entry['prefix'] != prefix:
+        try:
+            product = visible_products().select_related('category').get(id=product_id)
+        except Product.DoesNotExist:
+            return None
+        data = dict(ProductDetailSerializer(product, context={'request': request}).data)
+        detail_cache.set(
+            ('category', product.category_id),
+            {'data': data['category'], 'updated_at': product.category.updated_at}
+        )
+        detail_cache.set(('product', product_id), {
+            'prefix': prefix,
+            'category_id': product.category_id,
+            'data': data,
+            'updated_at': product.updated_at,
+        })
+        return data, product.updated_at, product.category.updated_at
+
+    category = _category_entry(entry['category_id'])
+    if category is None:
+        detail_cache.discard(('product', product_id))
+        return cached_product_detail(request, product_id)
+    return {**entry['data'], 'category': category['data']}, entry['updated_at'], category['updated_at']
+
+
+def evict_products(product_ids):
+    """Drop cached products once the current transaction commits"""
+    product_ids = list(product_ids)
+
+    def evict():
+        for product_id in product_ids:
+            detail_cache.discard(('product', product_id))
+    transaction.on_commit(evict)
+
+
+def evict_categories(category_ids):
+    """Drop cached category payloads once the current transaction commits"""
+    category_ids = list(category_ids)
+
+    def evict():
+        for category_id in category_ids:
+            detail_cache.discard(('category', category_id))
+    transaction.on_commit(evict)
+
+
+def clear_detail_cache():
+    transaction.on_commit(detail_cache.clear)
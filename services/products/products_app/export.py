@@ -0,0 +1,68 @@
+"""
+Streaming catalog export.
+
+Rows are read in keyset chunks on (updated_at, id) and encoded one at a
+time, so worker memory does not grow with the catalog and the first bytes
+are sent as soon as the first chunk is read. Each chunk is a separate query
+read to the end before any of it is sent: an open SELECT would hold SQLite's
+shared lock, and with the rollback journal block every product write, for as
+long as a slow client takes to download.
+"""
+import csv
+import json
+from django.db.models import Q
+from .fast_serializers import iter_product_rows
+
+CSV_COLUMNS = [
+    'id', 'name', 'description', 'price', 'category', 'category_name',
+    'stock', 'image', 'created_at', 'updated_at',
+]
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def keyset_chunks(rows, chunk_size):
+    """
+    Yield the rows of a product_rows() queryset in (updated_at, id) order,
+    fetching chunk_size rows per query. A product updated during the export
+    moves past the cursor and is exported again with its new values.
+    """
+    rows = rows.order_by('updated_at', 'id')
+    after = None
+    while True:
+        page = rows
+        if after is not None:
+            page = page.filter(Q(updated_at__gt=after[0]) | Q(updated_at=after[0], id__gt=after[1]))
+        chunk = list(page[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        after = (chunk[-1]['updated_at'], chunk[-1]['id'])
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(rows, request=None):
+    for product in iter_product_rows(rows, request):
+        yield json.dumps(product, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def csv_lines(rows, request=None):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for product in iter_product_rows(rows, request):
+        yield writer.writerow([product[column] for column in CSV_COLUMNS])
+
+
+def export_lines(fmt, rows, request=None):
+    """Encoded export lines for the given format"""
+    if fmt == 'csv':
+        return csv_lines(rows, request)
+    return ndjson_lines(rows, request)
@@ -0,0 +1,172 @@
+"""
+Read-optimized serialization for catalog listings.
+
+Produces the same JSON as ProductSerializer / CategorySerializer, but from
+flat ``values()`` rows fetched in a single joined query, without building a
+DRF field tree per object. With a sparse fieldset (see fields.py) only the
+columns behind the requested fields are selected and only those fields are
+formatted.
+"""
+from django.core.files.storage import default_storage
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+from .images import variant_urls
+
+PRODUCT_COLUMNS = (
+    'id', 'name', 'description', 'price', 'category_id', 'category__name',
+    'stock', 'image', 'image_variants', 'created_at', 'updated_at',
+)
+CATEGORY_COLUMNS = (
+    'id', 'name', 'description', 'parent_id', 'product_count', 'in_stock_count', 'stock_value',
+    'created_at', 'updated_at',
+)
+# Product listing field -> the columns it is built from
+PRODUCT_FIELD_COLUMNS = {
+    'id': ('id',),
+    'name': ('name',),
+    'description': ('description',),
+    'price': ('price',),
+    'category': ('category_id',),
+    'category_name': ('category__name',),
+    'stock': ('stock',),
+    'image': ('image',),
+    'image_variants': ('image', 'image_variants'),
+    'created_at': ('created_at',),
+    'updated_at': ('updated_at',),
+}
+PRODUCT_FIELDS = tuple(PRODUCT_FIELD_COLUMNS)
+PRODUCT_EXPANSIONS = ('category',)
+# Joined columns of the embedded category for ?expand=category
+EXPANDED_CATEGORY_COLUMNS = tuple(f'category__{column}' for column in CATEGORY_COLUMNS)
+
+# Field instances are reused so formatting matches the DRF serializers exactly
+_price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+_stock_value_field = serializers.DecimalField(max_digits=16, decimal_places=2)
+_datetime_field = serializers.DateTimeField()
+
+
+def product_rows(queryset, fields=None, expand=(), extra=()):
+    """
+    Restrict a Product queryset to the flat columns used by the listing, or
+    to those the requested fields and expansions need. `extra` names columns
+    the caller reads itself, e.g. the pagination sort column.
+    """
+    if fields is None and not expand:
+        return queryset.values(*PRODUCT_COLUMNS)
+    columns = {'id', *extra}
+    for field in fields or PRODUCT_FIELDS:
+        columns.update(PRODUCT_FIELD_COLUMNS[field])
+    if 'category' in expand and (fields is None or 'category' in fields):
+        columns.update(EXPANDED_CATEGORY_COLUMNS)
+    return queryset.values(*columns)
+
+
+def category_rows(queryset):
+    """Restrict a Category queryset to the flat columns used by the listing"""
+    return queryset.values(*CATEGORY_COLUMNS)
+
+
+def image_url_prefix(request=None):
+    """Absolute media URL prefix, computed once per request"""
+    base_url = default_storage.base_url
+    if request:
+        return request.build_absolute_uri(base_url)
+    return f'http://localhost:8001{base_url}'
+
+
+def _product_formatters(request, fields, expand):
+    """(field, row -> value) pairs for the requested fields, in order"""
+    prefix = image_url_prefix(request)
+    price = _price_field.to_representation
+    timestamp = _datetime_field.to_representation
+
+    def image(row):
+        return prefix + filepath_to_uri(row['image']) if row['image'] else None
+
+    def image_variants(row):
+        return variant_urls(row['image_variants'], prefix) if row['image'] else None
+
+    def category(row):
+        return serialize_category_rows([
+            {column: row[f'category__{column}'] for column in CATEGORY_COLUMNS}
+        ])[0]
+
+    formatters = {
+        'id': lambda row: row['id'],
+        'name': lambda row: row['name'],
+        'description': lambda row: row['description'],
+        'price': lambda row: price(row['price']),
+        'category': category if 'category' in expand else lambda row: row['category_id'],
+        'category_name': lambda row: row['category__name'],
+        'stock': lambda row: row['stock'],
+        'image': image,
+        'image_variants': image_variants,
+        'created_at': lambda row: timestamp(row['created_at']),
+        'updated_at': lambda row: timestamp(row['updated_at']),
+    }
+    return [(field, formatters[field]) for field in fields or PRODUCT_FIELDS]
+
+
+def iter_product_rows(rows, request=None, fields=None, expand=()):
+    """
+    Lazily serialize product rows into ProductSerializer-compatible dicts,
+    limited to `fields` and with `expand`ed relations embedded if given
+    """
+    if fields is not None or expand:
+        formatters = _product_formatters(request, fields, expand)
+        for row in rows:
+            yield {field: formatter(row) for field, formatter in formatters}
+        return
+
+    prefix = image_url_prefix(request)
+    price = _price_field.to_representation
+    timestamp = _datetime_field.to_representation
+    for row in rows:
+        yield {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'price': price(row['price']),
+            'category': row['category_id'],
+            'category_name': row['category__name'],
+            'stock': row['stock'],
+            'image': prefix + filepath_to_uri(row['image']) if row['image'] else None,
+            'image_variants': variant_urls(row['image_variants'], prefix) if row['image'] else None,
+            'created_at': timestamp(row['created_at']),
+            'updated_at': timestamp(row['updated_at']),
+        }
+
+
+def serialize_product_rows(rows, request=None, fields=None, expand=()):
+    """Serialize product rows into ProductSerializer-compatible dicts"""
+    return list(iter_product_rows(rows, request, fields, expand))
+
+
+def serialize_category_rows(rows):
+    """Serialize category rows into CategorySerializer-compatible dicts"""
+    stock_value = _stock_value_field.to_representation
+    timestamp = _datetime_field.to_representation
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'parent': row['parent_id'],
+            'product_count': row['product_count'],
+            'in_stock_count': row['in_stock_count'],
+            'stock_value': stock_value(row['stock_value']),
+            'created_at': timestamp(row['created_at']),
+            'updated_at': timestamp(row['updated_at']),
+        }
+        for row in rows
+    ]
+
+
+def serialize_subtree_totals(totals=None):
+    """Format a category_tree.subtree_totals() entry (zeros if None)"""
+    totals = totals or {}
+    return {
+        'subtree_product_count': totals.get('subtree_product_count') or 0,
+        'subtree_in_stock_count': totals.get('subtree_in_stock_count') or 0,
+        'subtree_stock_value': _stock_value_field.to_representation(totals.get('subtree_stock_value') or 0),
+    }
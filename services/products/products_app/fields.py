@@ -0,0 +1,42 @@
+"""
+Sparse fieldsets for product responses.
+
+?fields=id,name,price limits each product to the listed fields; listings
+then select only the columns those fields are built from and skip the
+formatting of everything else. ?expand=category embeds the full category
+object in place of its id.
+"""
+
+
+class InvalidFields(Exception):
+    """Raised when ?fields= or ?expand= names something the endpoint does not have"""
+
+
+def _names(value):
+    return tuple(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+
+
+def parse_fields(params, available, expandable=()):
+    """
+    Parse ?fields= and ?expand= into (fields, expand): a tuple of field names,
+    or None for every field, and a set of relations to expand.
+    """
+    fields = None
+    if params.get('fields'):
+        fields = _names(params['fields'])
+        unknown = [field for field in fields if field not in available]
+        if unknown:
+            raise InvalidFields(f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(available)}.')
+
+    expand = set(_names(params.get('expand', '')))
+    unknown = sorted(expand - set(expandable))
+    if unknown:
+        raise InvalidFields(f'Cannot expand: {", ".join(unknown)}.')
+    return fields, expand
+
+
+def pick(data, fields):
+    """Keep only the requested keys of a serialized object (all of them if fields is None)"""
+    if fields is None:
+        return data
+    return {field: data[field] for field in fields if field in data}
@@ -0,0 +1,133 @@
+"""
+Server-side filtering and facet counts for product listings.
+
+Supported query params: category_id (one id or a comma separated list; each
+matches its whole subtree), min_price, max_price, in_stock and ordering
+(see pagination.ORDERINGS).
+"""
+from decimal import Decimal, InvalidOperation
+from django.db.models import Count, Q
+from .models import Category, Product
+from .pagination import ORDERINGS
+from .category_tree import subtree_ids
+
+# Upper bounds of the price facet buckets; the last bucket is open ended
+PRICE_BUCKETS = [Decimal(edge) for edge in ('25', '50', '100', '250', '500', '1000')]
+
+
+class InvalidFilter(Exception):
+    """Raised when a listing filter parameter cannot be parsed"""
+
+
+def _decimal_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise InvalidFilter(f'{name} must be a number.')
+
+
+def visible_categories():
+    """Categories that are not being deleted in the background"""
+    return Category.objects.filter(deleting=False)
+
+
+def visible_products():
+    """Products outside categories that are being deleted in the background"""
+    return Product.objects.exclude(category_id__in=Category.objects.filter(deleting=True).values('id'))
+
+
+def parse_filters(params):
+    """Parse listing query params into a dict of filter values"""
+    category_ids = []
+    for value in params.getlist('category_id'):
+        for part in value.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                raise InvalidFilter(f'Invalid category id: {part}')
+            category_ids.append(int(part))
+
+    ordering = params.get('ordering') or None
+    if ordering is not None and ordering not in ORDERINGS:
+        raise InvalidFilter(f'ordering must be one of: {", ".join(ORDERINGS)}.')
+
+    return {
+        'category_ids': category_ids,
+        'min_price': _decimal_param(params, 'min_price'),
+        'max_price': _decimal_param(params, 'max_price'),
+        'in_stock': params.get('in_stock', '').lower() in ('1', 'true', 'yes'),
+        'ordering': ordering,
+    }
+
+
+def filter_products(filters, queryset=None, skip=()):
+    """Apply parsed filters to a Product queryset, skipping the named filters"""
+    if queryset is None:
+        queryset = visible_products()
+    if filters['category_ids'] and 'category' not in skip:
+        queryset = queryset.filter(category_id__in=subtree_ids(filters['category_ids']))
+    if 'price' not in skip:
+        if filters['min_price'] is not None:
+            queryset = queryset.filter(price__gte=filters['min_price'])
+        if filters['max_price'] is not None:
+            queryset = queryset.filter(price__lte=filters['max_price'])
+    if filters['in_stock']:
+        queryset = queryset.filter(stock__gt=0)
+    return queryset
+
+
+def order_products(queryset, ordering):
+    """Order an unpaginated listing; None keeps the model's default ordering"""
+    if ordering is None:
+        return queryset
+    column, descending = ORDERINGS[ordering]
+    return queryset.order_by(f'-{column}' if descending else column, '-id' if descending else 'id')
+
+
+def missing_categories(filters):
+    """Requested category ids that do not exist"""
+    existing = set(visible_categories().filter(id__in=filters['category_ids']).values_list('id', flat=True))
+    return [category_id for category_id in filters['category_ids'] if category_id not in existing]
+
+
+def facet_counts(filters):
+    """
+    Facet counts in SQL. Each facet ignores its own filter so clients can
+    show how many products the other choices would return.
+    """
+    categories = list(
+        filter_products(filters, skip=('category',))
+        .values('category_id', 'category__name')
+        .annotate(count=Count('id'))
+        .order_by('category__name')
+    )
+
+    bounds = [None] + PRICE_BUCKETS + [None]
+    aggregates = {}
+    for i, (low, high) in enumerate(zip(bounds, bounds[1:])):
+        condition = Q()
+        if low is not None:
+            condition &= Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        aggregates[f'bucket_{i}'] = Count('id', filter=condition)
+    counts = filter_products(filters, skip=('price',)).order_by().aggregate(**aggregates)
+
+    return {
+        'categories': [
+            {'id': row['category_id'], 'name': row['category__name'], 'count': row['count']}
+            for row in categories
+        ],
+        'price_buckets': [
+            {
+                'min': str(low) if low is not None else None,
+                'max': str(high) if high is not None else None,
+                'count': counts[f'bucket_{i}'],
+            }
+            for i, (low, high) in enumerate(zip(bounds, bounds[1:]))
+        ],
+    }
@@ -0,0 +1,160 @@
+"""
+Product image derivatives.
+
+Uploaded originals are resized into fixed-size variants (thumb, card, full),
+each stored in the original format and as WebP. Generation runs in a small
+thread pool after the upload's transaction commits, never in the request
+thread. The stored paths are recorded on Product.image_variants, which
+serializers turn into absolute URLs.
+
+Derivative names are built from the original's name, so the derivatives of
+a content-addressed original are content-addressed too and are generated
+only once however many products share it. release_images() deletes an
+original and its derivatives once no product references it.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from PIL import Image, ImageOps
+from .storage import is_content_addressed
+
+VARIANT_SIZES = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'full': (1200, 1200),
+}
+DERIVED_DIR = 'products/derived'
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+DERIVED_EXTENSIONS = ('jpg', 'png', 'webp')
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PRODUCT_IMAGE_WORKERS', 2),
+    thread_name_prefix='product-images'
+)
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _store(path, data):
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    return default_storage.save(path, ContentFile(data))
+
+
+def generate_variants(name):
+    """
+    Build every derivative for the stored image `name`.
+    Returns {'source': name, '<variant>': {'src': path, 'webp': path}, ...}
+    """
+    with default_storage.open(name, 'rb') as original:
+        # Image.open only reads the header; pixels are decoded by load()
+        image = Image.open(original)
+        # Keep PNG for images with transparency, JPEG for everything else
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        fmt, ext = ('PNG', 'png') if has_alpha else ('JPEG', 'jpg')
+        stem = os.path.splitext(os.path.basename(name))[0]
+        paths = {
+            variant: {'src': f'{DERIVED_DIR}/{stem}_{variant}.{ext}', 'webp': f'{DERIVED_DIR}/{stem}_{variant}.webp'}
+            for variant in VARIANT_SIZES
+        }
+        # Content-addressed derivatives that exist already were built from identical bytes
+        if is_content_addressed(name) and all(
+            default_storage.exists(path) for stored in paths.values() for path in stored.values()
+        ):
+            return {'source': name, **paths}
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    variants = {'source': name}
+    for variant, size in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        variants[variant] = {
+            'src': _store(paths[variant]['src'], _encode(resized, fmt)),
+            'webp': _store(paths[variant]['webp'], _encode(resized, 'WEBP')),
+        }
+    return variants
+
+
+def process_product_image(product_id, name):
+    """Generate derivatives and record them if the product still has the same image"""
+    from .models import Product
+    from .catalog_cache import invalidate_catalog
+    from .detail_cache import evict_products
+    from .changes import record_changes
+
+    close_old_connections()
+    try:
+        variants = generate_variants(name)
+        with transaction.atomic():
+            updated = Product.objects.filter(id=product_id, image=name).update(
+                image_variants=variants,
+                updated_at=timezone.now()
+            )
+            if updated:
+                record_changes([product_id])
+        if updated:
+            invalidate_catalog()
+            evict_products([product_id])
+        return variants
+    finally:
+        connection.close()
+
+
+def schedule_variants(product):
+    """Queue derivative generation for a product once the current transaction commits"""
+    product_id, name = product.id, product.image.name
+    transaction.on_commit(lambda: _executor.submit(process_product_image, product_id, name))
+
+
+def release_images(names):
+    """Delete stored originals, and their derivatives, that no product references any more"""
+    from .models import Product
+
+    names = {name for name in names if name}
+    if not names:
+        return
+    in_use = set(Product.objects.filter(image__in=names).values_list('image', flat=True))
+    for name in names - in_use:
+        stem = os.path.splitext(os.path.basename(name))[0]
+        paths = [name] + [
+            f'{DERIVED_DIR}/{stem}_{variant}.{ext}' for variant in VARIANT_SIZES for ext in DERIVED_EXTENSIONS
+        ]
+        for path in paths:
+            try:
+                default_storage.delete(path)
+            except OSError:
+                pass
+
+
+def schedule_release(names):
+    """release_images() once the current transaction commits"""
+    names = list(names)
+    transaction.on_commit(lambda: release_images(names))
+
+
+def variant_urls(variants, prefix):
+    """Turn stored variant paths into absolute URLs using a media URL prefix"""
+    if not variants:
+        return None
+    return {
+        variant: {kind: prefix + filepath_to_uri(path) for kind, path in paths.items()}
+        for variant, paths in variants.items()
+        if variant != 'source'
+    }
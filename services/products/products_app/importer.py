@@ -0,0 +1,195 @@
+"""
+Streaming bulk product import from CSV or NDJSON.
+
+Records are read one at a time from a file-like object, validated in
+chunks and written with one bulk INSERT (or primary-key upsert for rows
+that carry an id) per chunk, so memory stays bounded by the chunk size.
+"""
+import csv
+import io
+import json
+import time
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+from .models import Category, Product
+from .filters import visible_categories
+from .serializers import ProductImportSerializer
+from .catalog_cache import invalidate_catalog
+from .detail_cache import clear_detail_cache
+from . import search
+from .aggregates import recompute_categories
+from .inventory import record_movements
+from .changes import record_changes
+from . import sharding
+from . import suggest
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+UPSERT_FIELDS = ['name', 'description', 'price', 'category', 'stock', 'updated_at']
+
+
+def detect_format(filename):
+    """Guess the import format from a file name"""
+    if filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_records(stream, fmt):
+    """Yield (row_number, record) pairs from a binary stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for row_number, record in enumerate(csv.DictReader(text), start=1):
+            yield row_number, {key: value for key, value in record.items() if value != ''}
+    elif fmt == 'ndjson':
+        for row_number, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except ValueError:
+                yield row_number, None
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+
+class ProductImporter:
+    """Imports product records in chunks and collects a per-row report"""
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, create_categories=False):
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.categories = dict(visible_categories().values_list('name', 'id'))
+        # One serializer instance validates every row, so the field tree is built once
+        self.validator = ProductImportSerializer()
+        self.stats = {'rows': 0, 'created': 0, 'updated': 0, 'failed': 0}
+        self.errors = []
+
+    def run(self, records):
+        """Import an iterable of (row_number, record) pairs and return the report"""
+        started = time.perf_counter()
+        chunk = []
+        for row_number, record in records:
+            chunk.append((row_number, record))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+
+        invalidate_catalog()
+        clear_detail_cache()
+        elapsed = time.perf_counter() - started
+        return {
+            **self.stats,
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(self.stats['rows'] / elapsed, 1) if elapsed else None,
+            'errors': self.errors,
+        }
+
+    def _fail(self, row_number, errors):
+        self.stats['failed'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    def _category_id(self, name):
+        category_id = self.categories.get(name)
+        if category_id is None and self.create_categories:
+            category = Category.objects.get_or_create(name=name)[0]
+            # The name still belongs to a category that is being deleted
+            if category.deleting:
+                return None
+            category_id = self.categories[name] = category.id
+        return category_id
+
+    def _import_chunk(self, chunk):
+        self.stats['rows'] += len(chunk)
+        new_products, upserts = [], []
+        # (row number, product) pairs, for reporting a chunk that fails to write
+        valid = []
+        upsert_rows = {}
+        for row_number, record in chunk:
+            if not isinstance(record, dict):
+                self._fail(row_number, {'non_field_errors': ['Invalid JSON object']})
+                continue
+            try:
+                data = self.validator.run_validation(record)
+            except ValidationError as e:
+                self._fail(row_number, e.detail)
+                continue
+            category_id = self._category_id(data['category'])
+            if category_id is None:
+                self._fail(row_number, {'category': [f'Unknown category: {data["category"]}']})
+                continue
+            product = Product(
+                id=data.get('id'),
+                name=data['name'],
+                description=data.get('description'),
+                price=data['price'],
+                category_id=category_id,
+                stock=data['stock'],
+            )
+            if product.id in upsert_rows:
+                # A second row for one id would hit the primary key twice in the same INSERT
+                self._fail(row_number, {'id': [f'Duplicate id {product.id} (first seen on row {upsert_rows[product.id]})']})
+                continue
+            if product.id:
+                upsert_rows[product.id] = row_number
+            valid.append((row_number, product))
+            (upserts if product.id else new_products).append(product)
+
+        stats = dict(self.stats)
+        try:
+            self._write_chunk(new_products, upserts)
+        except IntegrityError as e:
+            # Nothing of the chunk was written; report each of its rows instead of failing the import
+            self.stats = stats
+            for row_number, _ in valid:
+                self._fail(row_number, {'non_field_errors': [f'Could not be saved: {e}']})
+
+    def _write_chunk(self, new_products, upserts):
+        with transaction.atomic():
+            created = Product.objects.bulk_create(new_products)
+            if upserts:
+                # Imported stock replaces the shard counts of sharded products
+                sharded = sharding.sharded_ids([p.id for p in upserts])
+                sharding.sync_stock(sharded)
+                existing = {
+                    product_id: (category_id, stock)
+                    for product_id, category_id, stock in Product.objects.filter(
+                        id__in=[p.id for p in upserts]
+                    ).values_list('id', 'category_id', 'stock')
+                }
+                Product.objects.bulk_create(
+                    upserts,
+                    update_conflicts=True,
+                    unique_fields=['id'],
+                    update_fields=UPSERT_FIELDS
+                )
+                for p in upserts:
+                    if p.id in sharded:
+                        sharding.reset_stock(p.id, p.stock)
+                self.stats['updated'] += len(existing)
+                self.stats['created'] += len(upserts) - len(existing)
+            self.stats['created'] += len(created)
+
+            touched = {p.category_id for p in created + upserts}
+            if upserts:
+                touched |= {category_id for category_id, _ in existing.values()}
+            recompute_categories(touched)
+
+            record_movements(
+                [(p.id, p.stock, p.stock) for p in created]
+                + [(p.id, p.stock - existing[p.id][1] if p.id in existing else p.stock, p.stock) for p in upserts],
+                'import'
+            )
+            record_changes(p.id for p in created + upserts)
+            suggest.products_saved((p.id, p.name, p.category_id) for p in created + upserts)
+
+            # bulk_create bypasses model signals, so index the chunk directly
+            category_names = {category_id: name for name, category_id in self.categories.items()}
+            search.index_rows(
+                (p.id, p.name, p.description, category_names[p.category_id])
+                for p in created + upserts
+            )
@@ -0,0 +1,102 @@
+"""
+Inventory ledger.
+
+Every stock change is appended to InventoryMovement in the same transaction
+as the change itself. InventorySnapshot rows periodically fold a product's
+movements into a stock figure, so the ledger stock of a product is its
+latest snapshot plus the movements recorded after it, and never needs a
+scan of the full history.
+"""
+from django.db.models import F, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import InventoryMovement, InventorySnapshot, Product
+
+
+def record_movements(entries, reason, reference=''):
+    """
+    Append movements for (product_id, delta, stock_after) entries.
+    Zero deltas are skipped.
+    """
+    InventoryMovement.objects.bulk_create(
+        [
+            InventoryMovement(
+                product_id=product_id,
+                delta=delta,
+                stock_after=stock_after,
+                reason=reason,
+                reference=reference or '',
+            )
+            for product_id, delta, stock_after in entries
+            if delta
+        ],
+        batch_size=1000
+    )
+
+
+def ledger_stock(product_ids, at=None):
+    """
+    Stock according to the ledger for the given products, optionally as of
+    a past datetime. Returns {product_id: stock} from a single query.
+    """
+    snapshots = InventorySnapshot.objects.filter(product_id=OuterRef('pk'))
+    movements = InventoryMovement.objects.filter(product_id=OuterRef('pk'), id__gt=OuterRef('snapshot_movement'))
+    if at is not None:
+        snapshots = snapshots.filter(created_at__lte=at)
+        movements = movements.filter(created_at__lte=at)
+    snapshots = snapshots.order_by('-movement_id')
+    movement_total = movements.order_by().values('product_id').annotate(total=Sum('delta')).values('total')
+
+    rows = (
+        Product.objects.filter(id__in=product_ids)
+        .annotate(
+            snapshot_movement=Coalesce(Subquery(snapshots.values('movement_id')[:1]), Value(0)),
+            snapshot_stock=Coalesce(Subquery(snapshots.values('stock')[:1]), Value(0)),
+        )
+        .annotate(
+            movement_total=Coalesce(Subquery(movement_total, output_field=IntegerField()), Value(0)),
+        )
+        .values_list('id', 'snapshot_stock', 'movement_total', 'snapshot_movement')
+    )
+    return {product_id: stock + total for product_id, stock, total, _ in rows}
+
+
+def take_snapshots(product_ids):
+    """Snapshot products that have movements newer than their latest snapshot"""
+    last_movement = dict(
+        InventoryMovement.objects.filter(product_id__in=product_ids)
+        .values('product_id')
+        .annotate(last=Max('id'))
+        .values_list('product_id', 'last')
+    )
+    last_snapshot = dict(
+        InventorySnapshot.objects.filter(product_id__in=product_ids)
+        .values('product_id')
+        .annotate(last=Max('movement_id'))
+        .values_list('product_id', 'last')
+    )
+    stale = [
+        product_id for product_id, movement_id in last_movement.items()
+        if movement_id > last_snapshot.get(product_id, 0)
+    ]
+    if not stale:
+        return 0
+
+    stock = ledger_stock(stale)
+    InventorySnapshot.objects.bulk_create(
+        [
+            InventorySnapshot(product_id=product_id, movement_id=last_movement[product_id], stock=stock[product_id])
+            for product_id in stale if product_id in stock
+        ]
+    )
+    return len(stale)
+
+
+def prune_movements(before):
+    """Delete movements created before `before` that a snapshot already covers"""
+    covered = InventorySnapshot.objects.filter(product_id=OuterRef('product_id')).order_by('-movement_id')
+    return (
+        InventoryMovement.objects.filter(created_at__lt=before)
+        .annotate(covered_up_to=Subquery(covered.values('movement_id')[:1]))
+        .filter(id__lte=F('covered_up_to'))
+        .delete()[0]
+    )
@@ -0,0 +1,69 @@
+"""
+Typeahead lookup benchmark on a suggest index of generated product names
+(2-4 words from a 30 word vocabulary, so short prefixes have long runs).
+
+Measured per call, limit 10:
+
+    products   build   precomputed   lookup 'p' / 'pro'   sale or return
+    10,000     0.30s   175 prefixes  9 / 10 us            63 us
+    100,000    4.02s   683 prefixes  10 / 11 us           90 us
+
+Lookups stay about 10 us right after sales, since a sale moves the product
+within the kept rankings instead of discarding them. Build time is mostly
+loading and sorting the keys; the precompute step is about 1.5s at 100k.
+"""
+import random
+import time
+from django.core.management.base import BaseCommand
+from products_app.suggest import SuggestIndex
+
+WORDS = [
+    'pro', 'portable', 'port', 'power', 'phone', 'case', 'cable', 'charger', 'smart', 'wireless',
+    'bluetooth', 'speaker', 'headphones', 'adapter', 'usb', 'laptop', 'stand', 'mouse', 'keyboard', 'screen',
+    'protector', 'mini', 'max', 'ultra', 'lite', 'home', 'kitchen', 'steel', 'cotton', 'shirt',
+]
+PREFIXES = ['p', 'pr', 'pro', 'port', 'c', 'sm', 'screen pro', 'zz']
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark typeahead lookups on an in-memory suggest index of generated '
+        'product names; the database is not touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            self._run(size, options['repeat'])
+
+    def _time(self, fn, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1e6
+
+    def _run(self, size, repeat):
+        rng = random.Random(size)
+        index = SuggestIndex()
+        start = time.perf_counter()
+        for product_id in range(size):
+            name = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 4)))
+            index._scores[('product', product_id)] = rng.randint(0, 500)
+            index._put(('product', product_id), name, None)
+        index._keys.sort()
+        index.precompute()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{size} products: built in {elapsed:.2f}s, {len(index._top)} precomputed prefixes')
+
+        for prefix in PREFIXES:
+            micros = self._time(lambda: index.lookup(prefix, 10), repeat)
+            self.stdout.write(f'  lookup {prefix!r:<14} {micros:9.1f} us')
+
+        def sale():
+            index.add_sales({rng.randrange(size): rng.choice([1, 1, 1, -1])})
+        self.stdout.write(f'  {"sale or return":<21} {self._time(sale, repeat):9.1f} us')
+        after_sales = self._time(lambda: index.lookup('p', 10), repeat)
+        self.stdout.write(f'  {"lookup after sales":<21} {after_sales:9.1f} us')
@@ -0,0 +1,47 @@
+import json
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from products_app.catalog_cache import invalidate_catalog
+from products_app.related import TOP_K, fold_baskets
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold order baskets (NDJSON lines of {"order_id": ..., "product_ids": [...]}, '
+        'as written by the orders service export_order_baskets command) into '
+        '"frequently bought together" recommendations'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='NDJSON file, or - for stdin')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--top-k', type=int, default=TOP_K)
+
+    def read_baskets(self, stream):
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                yield int(record['order_id']), [int(product_id) for product_id in record['product_ids']]
+            except (ValueError, KeyError, TypeError):
+                raise CommandError(f'Line {line_number}: expected {{"order_id": ..., "product_ids": [...]}}')
+
+    def handle(self, *args, **options):
+        try:
+            stream = sys.stdin if options['path'] == '-' else open(options['path'])
+        except OSError as e:
+            raise CommandError(str(e))
+        with stream:
+            stats = fold_baskets(
+                self.read_baskets(stream),
+                batch_size=options['batch_size'],
+                top_k=options['top_k']
+            )
+
+        if stats['orders']:
+            invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f'Folded {stats["orders"]} orders ({stats["skipped"]} already seen), '
+            f'{stats["pairs"]} pair updates, {stats["products"]} products re-ranked; cursor at {stats["cursor"]}'
+        ))
@@ -0,0 +1,91 @@
+import hashlib
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from products_app.models import Product
+from products_app.catalog_cache import invalidate_catalog
+from products_app.changes import record_changes
+from products_app.detail_cache import evict_products
+from products_app.images import process_product_image, release_images
+from products_app.storage import content_name, is_content_addressed
+
+IMAGE_DIR = 'products'
+
+
+def file_digest(name):
+    digest = hashlib.sha256()
+    with default_storage.open(name, 'rb') as f:
+        for chunk in f.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Move product images to content-addressed names, keeping one file per distinct content'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without touching anything')
+        parser.add_argument(
+            '--delete-orphans', action='store_true',
+            help=f'Also delete files under {IMAGE_DIR}/ that no product references'
+        )
+
+    def handle(self, *args, **options):
+        storage = Product._meta.get_field('image').storage
+        referenced = set(
+            Product.objects.exclude(image='').exclude(image__isnull=True)
+            .values_list('image', flat=True).distinct()
+        )
+
+        moved = missing = 0
+        digests = set()
+        for name in sorted(referenced):
+            if is_content_addressed(name):
+                continue
+            if not default_storage.exists(name):
+                missing += 1
+                self.stderr.write(f'{name}: file missing')
+                continue
+
+            if options['dry_run']:
+                new_name = content_name(name, file_digest(name))
+                self.stdout.write(f'{name} -> {new_name}')
+            else:
+                with default_storage.open(name, 'rb') as f:
+                    new_name = storage.save(name, f)
+                with transaction.atomic():
+                    product_ids = list(Product.objects.filter(image=name).values_list('id', flat=True))
+                    Product.objects.filter(id__in=product_ids).update(
+                        image=new_name, image_variants={}, updated_at=timezone.now()
+                    )
+                    record_changes(product_ids)
+                    evict_products(product_ids)
+                # The old file and its derivatives are unreferenced now
+                release_images([name])
+                # Derivatives are built once per digest and reused for the other products
+                for product_id in product_ids:
+                    try:
+                        process_product_image(product_id, new_name)
+                    except Exception as e:
+                        self.stderr.write(f'Product {product_id}: variants not generated: {e}')
+            moved += 1
+            digests.add(new_name)
+
+        if not options['dry_run']:
+            referenced = set(Product.objects.filter(image__startswith=f'{IMAGE_DIR}/').values_list('image', flat=True))
+        orphans = [
+            f'{IMAGE_DIR}/{filename}'
+            for filename in default_storage.listdir(IMAGE_DIR)[1]
+            if not filename.startswith('.') and f'{IMAGE_DIR}/{filename}' not in referenced
+        ] if default_storage.exists(IMAGE_DIR) else []
+        if options['delete_orphans'] and not options['dry_run']:
+            release_images(orphans)
+
+        if moved and not options['dry_run']:
+            invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Would move" if options["dry_run"] else "Moved"} {moved} images into {len(digests)} '
+            f'content-addressed files; {missing} missing, {len(orphans)} unreferenced'
+            f'{" (deleted)" if options["delete_orphans"] and not options["dry_run"] else ""}'
+        ))
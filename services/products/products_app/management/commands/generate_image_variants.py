@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from products_app.models import Product
+from products_app.images import process_product_image
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail, card, full and WebP derivatives for existing product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--force', action='store_true', help='Regenerate even if variants are up to date')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).values_list(
+            'id', 'image', 'image_variants'
+        )
+        jobs = [
+            (product_id, image)
+            for product_id, image, variants in products.iterator(chunk_size=1000)
+            if options['force'] or (variants or {}).get('source') != image
+        ]
+
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {pool.submit(process_product_image, product_id, image): product_id for product_id, image in jobs}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'Product {futures[future]}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {done} products ({failed} failed)'))
@@ -0,0 +1,32 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from products_app.importer import DEFAULT_CHUNK_SIZE, ProductImporter, detect_format, iter_records
+
+
+class Command(BaseCommand):
+    help = 'Stream-import products from a CSV or NDJSON file in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'])
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--create-categories', action='store_true')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        importer = ProductImporter(
+            chunk_size=options['chunk_size'],
+            create_categories=options['create_categories']
+        )
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(iter_records(stream, fmt))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report.pop('errors'):
+            self.stderr.write(f'Row {error["row"]}: {json.dumps(error["errors"])}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{report["rows"]} rows: {report["created"]} created, {report["updated"]} updated, '
+            f'{report["failed"]} failed in {report["seconds"]}s ({report["rows_per_sec"]} rows/sec)'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products_app.category_tree import rebuild_closure
+from products_app.catalog_cache import invalidate_catalog
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the category closure table from the category parent links'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = rebuild_closure()
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(f'Category closure rebuilt: {rows} rows'))
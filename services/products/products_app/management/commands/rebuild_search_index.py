@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products_app.models import Product
+from products_app import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index in batches, committing after each one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # Each batch is its own short transaction, so product writes are only
+        # held up for one batch and searches keep working during the rebuild
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(
+                Product.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                total += search.reindex_range(last_id, ids[-1])
+            last_id = ids[-1]
+            self.stdout.write(f'Indexed {total} products')
+
+        with transaction.atomic():
+            search.remove_stale()
+
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt: {total} products'))
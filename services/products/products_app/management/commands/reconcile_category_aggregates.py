@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from products_app.aggregates import recompute_categories
+from products_app.catalog_cache import invalidate_catalog
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-category product counts and stock value and fix any drift'
+
+    def handle(self, *args, **options):
+        changed = recompute_categories()
+        for category in changed:
+            self.stdout.write(
+                f'{category.name}: {category.product_count} products, '
+                f'{category.in_stock_count} in stock, value {category.stock_value}'
+            )
+        if changed:
+            invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(changed)} categories'))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products_app.models import Product
+from products_app.inventory import ledger_stock, record_movements
+from products_app.sharding import sharded_ids, sync_stock
+
+
+class Command(BaseCommand):
+    help = 'Compare the inventory ledger against Product.stock in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Record a reconcile movement so the ledger matches Product.stock'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = mismatched = 0
+        while True:
+            batch = list(
+                Product.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'stock')[:batch_size]
+            )
+            if not batch:
+                break
+            # Sharded products may not have synced their stock yet
+            sharded = sharded_ids([product_id for product_id, _ in batch])
+            if sharded:
+                sync_stock(sharded)
+                batch = list(
+                    Product.objects.filter(id__in=[product_id for product_id, _ in batch])
+                    .order_by('id').values_list('id', 'stock')
+                )
+            last_id = batch[-1][0]
+            checked += len(batch)
+
+            with transaction.atomic():
+                ledger = ledger_stock([product_id for product_id, _ in batch])
+                drift = [
+                    (product_id, stock - ledger.get(product_id, 0), stock)
+                    for product_id, stock in batch
+                    if ledger.get(product_id, 0) != stock
+                ]
+                for product_id, delta, stock in drift:
+                    self.stdout.write(f'Product {product_id}: stock {stock}, ledger {stock - delta}')
+                if options['fix']:
+                    record_movements(drift, 'reconcile')
+            mismatched += len(drift)
+
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} products, {mismatched} mismatched'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from products_app.models import Product
+from products_app.sharding import DEFAULT_SHARDS, MAX_SHARDS, disable_sharding, enable_sharding
+
+
+class Command(BaseCommand):
+    help = 'Split the stock of hot products across sharded counters, or fold it back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='+', type=int)
+        parser.add_argument(
+            '--shards', type=int, default=DEFAULT_SHARDS,
+            help=f'Number of counters per product (1-{MAX_SHARDS}); 0 disables sharding'
+        )
+
+    def handle(self, *args, **options):
+        found = set(Product.objects.filter(id__in=options['product_ids']).values_list('id', flat=True))
+        missing = [product_id for product_id in options['product_ids'] if product_id not in found]
+        if missing:
+            raise CommandError(f'Unknown products: {", ".join(map(str, missing))}')
+
+        for product_id in options['product_ids']:
+            if options['shards'] > 0:
+                enable_sharding(product_id, options['shards'])
+                self.stdout.write(f'Product {product_id}: stock split across {options["shards"]} shards')
+            else:
+                disable_sharding(product_id)
+                self.stdout.write(f'Product {product_id}: sharding disabled')
+        self.stdout.write(self.style.SUCCESS(f'Updated {len(found)} products'))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from products_app.models import Product
+from products_app.inventory import prune_movements, take_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Fold recent inventory movements into per-product snapshots (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--prune-days', type=int,
+            help='Also delete movements older than this many days that a snapshot covers'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(
+                Product.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                total += take_snapshots(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Created {total} snapshots'))
+
+        if options['prune_days'] is not None:
+            pruned = prune_movements(timezone.now() - timedelta(days=options['prune_days']))
+            self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} movements'))
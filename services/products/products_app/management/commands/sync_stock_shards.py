@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from products_app.models import Product
+from products_app.sharding import sync_stock
+
+
+class Command(BaseCommand):
+    help = 'Copy shard totals into Product.stock and rebalance the shards of every sharded product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.filter(stock_shards__gt=0).values_list('id', flat=True))
+        changed = 0
+        for start in range(0, len(product_ids), options['batch_size']):
+            changed += len(sync_stock(product_ids[start:start + options['batch_size']]))
+        self.stdout.write(self.style.SUCCESS(f'Synced {len(product_ids)} sharded products, {changed} changed'))
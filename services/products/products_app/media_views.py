@@ -0,0 +1,160 @@
+"""
+Media file serving.
+
+Serves files under MEDIA_ROOT with ETag/Last-Modified validators, single
+byte-range requests and cache headers. Whole files (and open-ended ranges)
+are returned as FileResponse objects around the real file, so WSGI servers
+with a file wrapper (gunicorn, uWSGI) send them with sendfile() instead of
+copying through Python. Content-addressed files, whose name is the SHA-256
+of their content (see storage.py), never change and are marked immutable.
+
+With MEDIA_ACCEL_REDIRECT_PREFIX set, the view only resolves and validates
+the path and hands the transfer to the front proxy via X-Accel-Redirect
+(nginx: an `internal` location aliasing MEDIA_ROOT under that prefix).
+"""
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.encoding import iri_to_uri
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+from .storage import is_content_addressed
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+STREAM_BLOCK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class BoundedFile:
+    """Read at most `length` bytes of an open file, starting at its current position"""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header into an inclusive (start, end).
+    Returns None for headers that should be ignored (malformed or
+    multi-range, which are answered with the full file).
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        start, end = max(size - length, 0), size - 1
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def range_applies(request, etag, last_modified):
+    """If-Range: only honour Range when the client's copy is still current"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _cache_headers(response, path, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = (
+        IMMUTABLE_CACHE_CONTROL if is_content_addressed(path) else REVALIDATE_CACHE_CONTROL
+    )
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """GET/HEAD: a file under MEDIA_ROOT"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        # ValueError: a NUL byte in the path
+        raise Http404('File not found.')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found.')
+
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{size:x}')
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _cache_headers(not_modified, path, etag, last_modified)
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+    if accel_prefix:
+        # The proxy streams the file and handles Range itself
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = iri_to_uri(accel_prefix.rstrip('/') + '/' + path)
+        return _cache_headers(response, path, etag, last_modified)
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return _cache_headers(response, path, etag, last_modified)
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        if end == size - 1:
+            # Runs to the end of the file: keep the real file so sendfile still applies
+            response = FileResponse(file, content_type=content_type, status=206)
+        else:
+            response = FileResponse(
+                BoundedFile(file, end - start + 1), content_type=content_type, status=206
+            )
+            response.block_size = STREAM_BLOCK_SIZE
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return _cache_headers(response, path, etag, last_modified)
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products_app', '0002_product_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE products_app_product_fts USING fts5("
+                "name, description, category_name, "
+                "tokenize = 'unicode61 remove_diacritics 2')",
+                "INSERT INTO products_app_product_fts (rowid, name, description, category_name) "
+                "SELECT p.id, p.name, COALESCE(p.description, ''), c.name "
+                "FROM products_app_product p "
+                "JOIN products_app_category c ON c.id = p.category_id",
+            ],
+            reverse_sql="DROP TABLE products_app_product_fts",
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:31
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Q, Sum
+
+
+def populate_aggregates(apps, schema_editor):
+    Category = apps.get_model('products_app', 'Category')
+    Product = apps.get_model('products_app', 'Product')
+    totals = (
+        Product.objects.values('category_id')
+        .annotate(
+            count=Count('id'),
+            in_stock=Count('id', filter=Q(stock__gt=0)),
+            value=Sum(F('price') * F('stock'), output_field=DecimalField()),
+        )
+    )
+    for row in totals:
+        Category.objects.filter(id=row['category_id']).update(
+            product_count=row['count'],
+            in_stock_count=row['in_stock'],
+            stock_value=Decimal(row['value'] or 0).quantize(Decimal('0.01')),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products_app', '0005_product_updated_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='in_stock_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='stock_value',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=16),
+        ),
+        migrations.RunPython(populate_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def snapshot_existing_stock(apps, schema_editor):
+    """Seed the ledger: existing stock becomes each product's first snapshot"""
+    Product = apps.get_model('products_app', 'Product')
+    InventorySnapshot = apps.get_model('products_app', 'InventorySnapshot')
+    InventorySnapshot.objects.bulk_create(
+        (
+            InventorySnapshot(product_id=product_id, movement_id=0, stock=stock)
+            for product_id, stock in Product.objects.values_list('id', 'stock').iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products_app', '0007_product_category_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('stock_after', models.IntegerField()),
+                ('reason', models.CharField(choices=[('initial', 'Initial stock'), ('order', 'Order'), ('cancel', 'Order cancellation'), ('adjust', 'Admin adjustment'), ('import', 'Bulk import'), ('reconcile', 'Reconciliation')], max_length=20)),
+                ('reference', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='movements', to='products_app.product')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['product', 'id'], name='movement_product_id_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_id', models.BigIntegerField()),
+                ('stock', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='snapshots', to='products_app.product')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['product', '-movement_id'], name='snapshot_product_movement_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_existing_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+def seed_existing_products(apps, schema_editor):
+    """Every existing product starts in the feed as an upsert"""
+    Product = apps.get_model('products_app', 'Product')
+    CatalogChange = apps.get_model('products_app', 'CatalogChange')
+    CatalogChange.objects.bulk_create(
+        (
+            CatalogChange(product_id=product_id, op='upsert')
+            for product_id in Product.objects.order_by('id').values_list('id', flat=True).iterator()
+        ),
+        batch_size=1000
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products_app', '0008_inventory_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(unique=True)),
+                ('op', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(seed_existing_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_closure(apps, schema_editor):
+    """Every existing category is a root: it is only its own ancestor"""
+    Category = apps.get_model('products_app', 'Category')
+    CategoryClosure = apps.get_model('products_app', 'CategoryClosure')
+    CategoryClosure.objects.bulk_create(
+        (
+            CategoryClosure(ancestor_id=category_id, descendant_id=category_id, depth=0)
+            for category_id in Category.objects.values_list('id', flat=True).iterator()
+        ),
+        batch_size=1000
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products_app', '0012_category_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='products_app.category'),
+        ),
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products_app.category')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products_app.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='category_closure_desc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='category_closure_unique')],
+            },
+        ),
+        migrations.RunPython(seed_closure, migrations.RunPython.noop),
+    ]
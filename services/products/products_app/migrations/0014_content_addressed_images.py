@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:59
+
+import products_app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products_app', '0013_category_tree'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=products_app.storage.ContentAddressedStorage(), upload_to='products/'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products_app', '0014_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAdjustment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('initial', 'Initial stock'), ('order', 'Order'), ('cancel', 'Order cancellation'), ('adjust', 'Admin adjustment'), ('import', 'Bulk import'), ('reconcile', 'Reconciliation')], max_length=20)),
+                ('reference', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('reason', 'reference'), name='stock_adjustment_unique')],
+            },
+        ),
+    ]
@@ -1,10 +1,22 @@
 from django.db import models
 from django.contrib.auth.models import User
+from .storage import product_image_storage
 
 class Category(models.Model):
     """Product Category Model"""
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True, null=True)
+    # Subcategories must be moved or deleted before their parent can be deleted
+    parent = models.ForeignKey(
+        'self', on_delete=models.PROTECT, null=True, blank=True, related_name='children'
+    )
+    # Denormalized product aggregates, maintained by aggregates.py
+    product_count = models.IntegerField(default=0, editable=False)
+    in_stock_count = models.IntegerField(default=0, editable=False)
+    stock_value = models.DecimalField(max_digits=16, decimal_places=2, default=0, editable=False)
+    # Set while a background deletion removes the category's products;
+    # the category and its products are hidden from every read path
+    deleting = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -16,6 +28,28 @@ class Category(models.Model):
         return self.name
 
 
+class CategoryClosure(models.Model):
+    """
+    One row per (ancestor, descendant) pair of the category tree, including
+    each category paired with itself at depth 0. Maintained by category_tree.py.
+    """
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also backs "descendants of X" lookups
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='category_closure_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='category_closure_desc_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.ancestor_id} > {self.descendant_id} ({self.depth})'
+
+
 class Product(models.Model):
     """Product Model"""
     name = models.CharField(max_length=255)
@@ -23,12 +57,201 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     stock = models.IntegerField(default=0)
-    image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Number of StockShard counters holding this product's stock; 0 = unsharded.
+    # Sharded products keep a lagging copy of the shard total in `stock`.
+    stock_shards = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Stored under the SHA-256 of the content; one file may back many products
+    image = models.ImageField(upload_to='products/', storage=product_image_storage, blank=True, null=True)
+    # Derivative paths written by images.process_product_image
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Backs keyset pagination over (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+            # Backs incremental exports filtered on updated_since
+            models.Index(fields=['updated_at', 'id'], name='product_updated_id_idx'),
+            # Back category-scoped price filters/sorts and newest-first listings
+            models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+            models.Index(fields=['category', 'created_at'], name='product_category_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class InventoryMovement(models.Model):
+    """Append-only record of a single stock change"""
+    REASON_CHOICES = [
+        ('initial', 'Initial stock'),
+        ('order', 'Order'),
+        ('cancel', 'Order cancellation'),
+        ('adjust', 'Admin adjustment'),
+        ('import', 'Bulk import'),
+        ('reconcile', 'Reconciliation'),
+    ]
+
+    # No database constraint: the ledger outlives deleted products
+    product = models.ForeignKey(
+        Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='movements'
+    )
+    delta = models.IntegerField()
+    stock_after = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    reference = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['product', 'id'], name='movement_product_id_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}: {self.delta:+d} ({self.reason})'
+
+
+class StockAdjustment(models.Model):
+    """
+    An order reservation or cancellation applied under its reference. The
+    unique constraint makes a repeated request, e.g. a retry after a timeout,
+    a no-op instead of a second adjustment.
+    """
+    reason = models.CharField(max_length=20, choices=InventoryMovement.REASON_CHOICES)
+    reference = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reason', 'reference'], name='stock_adjustment_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.reason} {self.reference}'
+
+
+class InventorySnapshot(models.Model):
+    """Stock of a product after all movements up to and including movement_id"""
+    product = models.ForeignKey(
+        Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='snapshots'
+    )
+    movement_id = models.BigIntegerField()
+    stock = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['product', '-movement_id'], name='snapshot_product_movement_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}: {self.stock} @ {self.movement_id}'
+
+
+class StockShard(models.Model):
+    """One of the sub-counters a sharded product's stock is split across"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='shards')
+    shard = models.PositiveSmallIntegerField()
+    stock = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='stock_shard_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}[{self.shard}]: {self.stock}'
+
+
+class CatalogChange(models.Model):
+    """
+    Latest change to a product, for the catalog change feed. The id is the
+    feed version; a product keeps only its newest row, so the table holds
+    one row per product plus tombstones for deleted ones.
+    """
+    OP_CHOICES = [
+        ('upsert', 'Upsert'),
+        ('delete', 'Delete'),
+    ]
+
+    product_id = models.BigIntegerField(unique=True)
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f'{self.id}: {self.op} {self.product_id}'
+
+
+class ProductPair(models.Model):
+    """Number of orders containing both products; stored in both directions"""
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    other = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'other'], name='product_pair_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} + {self.other_id}: {self.orders}'
+
+
+class RelatedProduct(models.Model):
+    """Precomputed top "frequently bought together" products, best first"""
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    related = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    orders = models.IntegerField()
+
+    class Meta:
+        ordering = ['product', 'rank']
+        indexes = [
+            models.Index(fields=['product', 'rank'], name='related_product_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} #{self.rank}: {self.related_id}'
+
+
+class PipelineCursor(models.Model):
+    """Position of an incremental batch pipeline in its input"""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
+
+
+class CategoryDeletion(models.Model):
+    """Progress of a background category deletion (see category_deletion.py)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    # Not a foreign key: the job outlives the category it deletes
+    category_id = models.BigIntegerField(db_index=True)
+    category_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.IntegerField(default=0)
+    deleted = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f'{self.category_name}: {self.deleted}/{self.total} ({self.status})'
@@ -0,0 +1,100 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# ordering name -> (sort column, descending)
+ORDERINGS = {
+    'newest': ('created_at', True),
+    'oldest': ('created_at', False),
+    'price': ('price', False),
+    '-price': ('price', True),
+    'name': ('name', False),
+    '-name': ('name', True),
+}
+DEFAULT_ORDERING = 'newest'
+
+
+class InvalidCursor(Exception):
+    """Raised when a pagination cursor or page size cannot be decoded"""
+
+
+def _dump_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _load_value(column, value):
+    if column == 'created_at':
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError
+        return parsed
+    if column == 'price':
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            raise ValueError
+    return str(value)
+
+
+def encode_cursor(row, ordering=DEFAULT_ORDERING):
+    """Build an opaque cursor pointing just after the given product row"""
+    column, _ = ORDERINGS[ordering]
+    payload = json.dumps([ordering, _dump_value(row[column]), row['id']])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering=DEFAULT_ORDERING):
+    """Return the (sort value, id) pair stored in a cursor for the given ordering"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_ordering, value, product_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if cursor_ordering != ordering:
+            raise ValueError
+        return _load_value(ORDERINGS[ordering][0], value), int(product_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor.')
+
+
+def parse_page_size(value):
+    """Clamp the requested page size to [1, MAX_PAGE_SIZE]"""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor('limit must be an integer.')
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def paginate_products(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, ordering=DEFAULT_ORDERING):
+    """
+    Keyset pagination over (sort column, id) for one of ORDERINGS.
+    Expects a values() queryset that includes both columns.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    column, descending = ORDERINGS[ordering]
+    if descending:
+        queryset = queryset.order_by(f'-{column}', '-id')
+    else:
+        queryset = queryset.order_by(column, 'id')
+
+    if cursor:
+        value, product_id = decode_cursor(cursor, ordering)
+        beyond = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{column}__{beyond}': value}) | Q(**{column: value, f'id__{beyond}': product_id})
+        )
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1], ordering)
+    return rows, next_cursor
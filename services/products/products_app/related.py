@@ -0,0 +1,110 @@
+"""
+"Frequently bought together" recommendations.
+
+Order baskets exported by the orders service are folded, in batches, into
+ProductPair counts (how many orders contained both products). After each
+batch the top-K partners of every product it touched are re-ranked in one
+window-function query and written to RelatedProduct, which the /related
+endpoint reads directly. A PipelineCursor remembers the last folded order
+id, so re-feeding an overlapping export never counts an order twice.
+"""
+from collections import Counter
+from itertools import combinations, islice
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .models import PipelineCursor, ProductPair, RelatedProduct
+
+CURSOR_NAME = 'related_products'
+TOP_K = 10
+# Pairs grow quadratically with basket size; very large baskets carry little signal
+MAX_BASKET_SIZE = 50
+
+
+def basket_pairs(baskets):
+    """Count product pairs, in both directions, over an iterable of product id lists"""
+    pairs = Counter()
+    for product_ids in baskets:
+        product_ids = sorted(set(product_ids))
+        if len(product_ids) > MAX_BASKET_SIZE:
+            continue
+        for a, b in combinations(product_ids, 2):
+            pairs[a, b] += 1
+            pairs[b, a] += 1
+    return pairs
+
+
+def fold_pairs(pairs):
+    """Add pair counts to ProductPair with one batched upsert"""
+    table = ProductPair._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (product_id, other_id, orders) VALUES (%s, %s, %s) '
+            f'ON CONFLICT (product_id, other_id) DO UPDATE SET orders = {table}.orders + excluded.orders',
+            [(a, b, count) for (a, b), count in pairs.items()]
+        )
+
+
+def refresh_related(product_ids, top_k=TOP_K):
+    """Re-rank the top-K partners of the given products"""
+    ranked = (
+        ProductPair.objects.filter(product_id__in=product_ids)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=[F('product_id')],
+            order_by=[F('orders').desc(), F('other_id').asc()]
+        ))
+        .filter(rank__lte=top_k)
+        .values_list('product_id', 'other_id', 'orders', 'rank')
+    )
+    RelatedProduct.objects.filter(product_id__in=product_ids).delete()
+    RelatedProduct.objects.bulk_create(
+        [
+            RelatedProduct(product_id=product_id, related_id=other_id, orders=orders, rank=rank)
+            for product_id, other_id, orders, rank in ranked
+        ],
+        batch_size=1000
+    )
+
+
+def fold_baskets(baskets, batch_size=1000, top_k=TOP_K):
+    """
+    Fold (order_id, [product_id, ...]) baskets, in increasing order id, into
+    the recommendations. Orders at or before the stored cursor are skipped.
+    Each batch commits together with the cursor. Returns run statistics.
+    """
+    cursor, _ = PipelineCursor.objects.get_or_create(name=CURSOR_NAME)
+    stats = {'orders': 0, 'skipped': 0, 'pairs': 0, 'products': 0}
+    baskets = iter(baskets)
+    while True:
+        batch = list(islice(baskets, batch_size))
+        if not batch:
+            break
+        fresh = [(order_id, product_ids) for order_id, product_ids in batch if order_id > cursor.position]
+        stats['skipped'] += len(batch) - len(fresh)
+        if not fresh:
+            continue
+
+        pairs = basket_pairs(product_ids for _, product_ids in fresh)
+        touched = sorted({a for a, _ in pairs})
+        with transaction.atomic():
+            fold_pairs(pairs)
+            for start in range(0, len(touched), 500):
+                refresh_related(touched[start:start + 500], top_k)
+            cursor.position = max(order_id for order_id, _ in fresh)
+            cursor.save(update_fields=['position', 'updated_at'])
+
+        stats['orders'] += len(fresh)
+        stats['pairs'] += len(pairs)
+        stats['products'] += len(touched)
+    stats['cursor'] = cursor.position
+    return stats
+
+
+def related_product_ids(product_id, limit=TOP_K):
+    """Precomputed related product ids for a product, best first"""
+    return list(
+        RelatedProduct.objects.filter(product_id=product_id)
+        .order_by('rank')
+        .values_list('related_id', flat=True)[:limit]
+    )
@@ -0,0 +1,121 @@
+"""
+Full-text product search over the products_app_product_fts FTS5 table.
+
+The table is keyed by product id (rowid) and holds the product name,
+description and category name. It is kept in sync by the handlers in
+signals.py and can be rebuilt with the rebuild_search_index command.
+"""
+import re
+from django.db import connection
+
+FTS_TABLE = 'products_app_product_fts'
+
+# bm25 column weights: name, description, category_name
+BM25_WEIGHTS = (10.0, 1.0, 4.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_query(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+    Every token must match; the last one is treated as a prefix.
+    """
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_product_ids(query, limit):
+    """Return product ids matching the query, best bm25 rank first"""
+    match = build_match_query(query)
+    if match is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, %s, %s, %s) LIMIT %s',
+            [match, *BM25_WEIGHTS, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def index_rows(rows):
+    """Upsert (product_id, name, description, category_name) rows"""
+    rows = [(pid, name, description or '', category_name) for pid, name, description, category_name in rows]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, category_name) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+
+def index_product(product):
+    """Index or re-index a single product"""
+    index_rows([(product.id, product.name, product.description, product.category.name)])
+
+
+def remove_product(product_id):
+    """Drop a product from the index"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def remove_products(product_ids):
+    """Drop several products from the index"""
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(product_id,) for product_id in product_ids])
+
+
+def rename_category(category):
+    """Refresh the category name on all of the category's indexed products"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {FTS_TABLE} SET category_name = %s '
+            f'WHERE rowid IN (SELECT id FROM products_app_product WHERE category_id = %s)',
+            [category.name, category.id]
+        )
+
+
+def remove_category(category_id):
+    """Drop every product of a category from the index"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} '
+            f'WHERE rowid IN (SELECT id FROM products_app_product WHERE category_id = %s)',
+            [category_id]
+        )
+
+
+def reindex_range(after_id, last_id):
+    """
+    Re-index the products with after_id < id <= last_id from the product
+    table. The DELETE comes first so the transaction holds the write lock
+    before it reads the rows it copies.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid > %s AND rowid <= %s', [after_id, last_id])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, category_name) '
+            f'SELECT p.id, p.name, COALESCE(p.description, \'\'), c.name '
+            f'FROM products_app_product p JOIN products_app_category c ON c.id = p.category_id '
+            f'WHERE p.id > %s AND p.id <= %s',
+            [after_id, last_id]
+        )
+        return cursor.rowcount
+
+
+def remove_stale(after_id=0):
+    """Drop index rows above after_id whose product no longer exists"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid > %s '
+            f'AND rowid NOT IN (SELECT id FROM products_app_product)',
+            [after_id]
+        )
@@ -1,24 +1,43 @@
 from rest_framework import serializers
-from .models import Category, Product
+from .models import Category, CategoryDeletion, Product
+from .fast_serializers import image_url_prefix
+from .images import variant_urls
+from .category_tree import is_in_subtree
 
 
 class CategorySerializer(serializers.ModelSerializer):
     """Serializer for Category model"""
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'parent', 'product_count', 'in_stock_count', 'stock_value', 'created_at', 'updated_at']
+        read_only_fields = ['product_count', 'in_stock_count', 'stock_value', 'created_at', 'updated_at']
+        extra_kwargs = {'parent': {'queryset': Category.objects.filter(deleting=False)}}
+
+    def validate_parent(self, parent):
+        if parent is not None and self.instance is not None and is_in_subtree(parent.id, self.instance.id):
+            raise serializers.ValidationError('A category cannot be moved under itself or one of its subcategories.')
+        return parent
+
+
+class CategoryDeletionSerializer(serializers.ModelSerializer):
+    """Serializer for CategoryDeletion jobs"""
+    class Meta:
+        model = CategoryDeletion
+        fields = ['id', 'category_id', 'category_name', 'status', 'total', 'deleted', 'error', 'created_at', 'updated_at']
 
 
 class ProductSerializer(serializers.ModelSerializer):
     """Serializer for Product model"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'category', 'category_name', 'stock', 'image', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'price', 'category', 'category_name', 'stock', 'image', 'image_variants', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
+        # Products cannot be moved into a category that is being deleted
+        extra_kwargs = {'category': {'queryset': Category.objects.filter(deleting=False)}}
     
     def get_image(self, obj):
         if obj.image:
@@ -28,15 +47,21 @@ class ProductSerializer(serializers.ModelSerializer):
             return f'http://localhost:8001{obj.image.url}'
         return None
 
+    def get_image_variants(self, obj):
+        if obj.image:
+            return variant_urls(obj.image_variants, image_url_prefix(self.context.get('request')))
+        return None
+
 
 class ProductDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer for Product with category details"""
     category = CategorySerializer(read_only=True)
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'category', 'stock', 'image', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'price', 'category', 'stock', 'image', 'image_variants', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
     
     def get_image(self, obj):
@@ -46,3 +71,28 @@ class ProductDetailSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
             return f'http://localhost:8001{obj.image.url}'
         return None
+
+    def get_image_variants(self, obj):
+        if obj.image:
+            return variant_urls(obj.image_variants, image_url_prefix(self.context.get('request')))
+        return None
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """Validates one row of a bulk product import; category is given by name"""
+    id = serializers.IntegerField(required=False, min_value=1)
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    category = serializers.CharField(max_length=255)
+    stock = serializers.IntegerField(required=False, default=0, min_value=0)
+
+
+class ProductBulkUpdateSerializer(serializers.Serializer):
+    """Validates one entry of a bulk product PATCH; category is given by id"""
+    id = serializers.IntegerField(min_value=1)
+    name = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    category = serializers.IntegerField(min_value=1, required=False)
+    stock = serializers.IntegerField(min_value=0, required=False)
@@ -0,0 +1,204 @@
+"""
+Sharded stock counters for hot products.
+
+A product opted into sharding has its stock split across N StockShard rows.
+Adjustments touch a single shard with a conditional update (a random one
+first, then the others), so concurrent checkouts of the same product write
+different rows instead of queueing on one. The shard total is the product's
+true stock; Product.stock is a copy refreshed by sync_stock(), which runs
+in a background thread after adjustments and also evens out the shards.
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import Product, StockShard
+from . import aggregates
+from .catalog_cache import invalidate_catalog
+from .changes import record_changes
+from .detail_cache import evict_products
+
+DEFAULT_SHARDS = getattr(settings, 'PRODUCT_STOCK_SHARDS', 8)
+MAX_SHARDS = 64
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stock-shards')
+_pending = set()
+_pending_lock = Lock()
+
+
+class ShardsChanged(Exception):
+    """A shard moved while being rebalanced; the rebalance is rolled back"""
+
+
+def _split(total, shards):
+    """Spread `total` as evenly as possible over `shards` counters"""
+    base, extra = divmod(max(total, 0), shards)
+    return [base + (1 if shard < extra else 0) for shard in range(shards)]
+
+
+def sharded_ids(product_ids):
+    """The subset of product_ids that are sharded"""
+    return set(
+        Product.objects.filter(id__in=product_ids, stock_shards__gt=0).values_list('id', flat=True)
+    )
+
+
+def shard_totals(product_ids):
+    """{product_id: total stock across shards} for sharded products"""
+    return dict(
+        StockShard.objects.filter(product_id__in=product_ids)
+        .values('product_id')
+        .annotate(total=Sum('stock'))
+        .values_list('product_id', 'total')
+    )
+
+
+def enable_sharding(product_id, shards=DEFAULT_SHARDS):
+    """Split a product's current stock across `shards` counters"""
+    shards = max(1, min(shards, MAX_SHARDS))
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(id=product_id)
+        if product.stock_shards:
+            sync_stock([product_id])
+            product.refresh_from_db(fields=['stock'])
+        StockShard.objects.filter(product_id=product_id).delete()
+        StockShard.objects.bulk_create([
+            StockShard(product_id=product_id, shard=shard, stock=stock)
+            for shard, stock in enumerate(_split(product.stock, shards))
+        ])
+        Product.objects.filter(id=product_id).update(stock_shards=shards)
+
+
+def disable_sharding(product_id):
+    """Fold a product's shards back into Product.stock"""
+    with transaction.atomic():
+        sync_stock([product_id])
+        StockShard.objects.filter(product_id=product_id).delete()
+        Product.objects.filter(id=product_id).update(stock_shards=0)
+
+
+def reset_stock(product_id, stock):
+    """Overwrite a sharded product's stock, e.g. after an absolute stock update"""
+    shards = StockShard.objects.filter(product_id=product_id).count()
+    for shard, value in enumerate(_split(stock, shards)):
+        StockShard.objects.filter(product_id=product_id, shard=shard).update(stock=value)
+
+
+def before_save(instance):
+    """
+    Bring a sharded product's stored stock up to date before save(). A stock
+    value the caller left untouched is replaced by the shard total; one the
+    caller changed is kept, and the shards are reset to it after the save.
+    """
+    loaded = Product.objects.filter(id=instance.pk).values_list('stock', flat=True).first()
+    sync_stock([instance.pk])
+    if loaded is not None and int(instance.stock) == loaded:
+        instance.stock = Product.objects.filter(id=instance.pk).values_list('stock', flat=True).first()
+    else:
+        instance._reset_shards = True
+
+
+def adjust(product_id, shards, delta):
+    """
+    Apply `delta` to a sharded product. Returns False, changing nothing, if a
+    decrement exceeds the stock left across all shards.
+    """
+    order = list(range(shards))
+    random.shuffle(order)
+    shard_rows = StockShard.objects.filter(product_id=product_id)
+    if delta >= 0:
+        shard_rows.filter(shard=order[0]).update(stock=F('stock') + delta)
+        return True
+
+    quantity = -delta
+    for shard in order:
+        if shard_rows.filter(shard=shard, stock__gte=quantity).update(stock=F('stock') - quantity):
+            return True
+
+    # No single shard can cover it: drain several, all or nothing
+    try:
+        with transaction.atomic():
+            remaining = quantity
+            for shard, stock in shard_rows.filter(stock__gt=0).values_list('shard', 'stock'):
+                take = min(stock, remaining)
+                if not shard_rows.filter(shard=shard, stock__gte=take).update(stock=F('stock') - take):
+                    raise ShardsChanged()
+                remaining -= take
+                if not remaining:
+                    return True
+            raise ShardsChanged()
+    except ShardsChanged:
+        return False
+
+
+def _rebalance(product_id, shards):
+    """Even out a product's shards without losing concurrent adjustments"""
+    current = dict(StockShard.objects.filter(product_id=product_id).values_list('shard', 'stock'))
+    target = _split(sum(current.values()), shards)
+    try:
+        with transaction.atomic():
+            for shard, stock in current.items():
+                if stock != target[shard]:
+                    updated = StockShard.objects.filter(product_id=product_id, shard=shard, stock=stock).update(
+                        stock=target[shard]
+                    )
+                    if not updated:
+                        raise ShardsChanged()
+    except ShardsChanged:
+        # Busy product; the next sync will try again
+        pass
+
+
+def sync_stock(product_ids):
+    """
+    Copy shard totals into Product.stock (keeping category aggregates, the
+    change feed and caches in step) and rebalance the shards.
+    """
+    totals = shard_totals(product_ids)
+    rows = Product.objects.filter(id__in=totals, stock_shards__gt=0).values_list(
+        'id', 'category_id', 'price', 'stock', 'stock_shards'
+    )
+    changed = []
+    with transaction.atomic():
+        for product_id, category_id, price, stock, shards in rows:
+            total = totals[product_id]
+            if total != stock:
+                Product.objects.filter(id=product_id).update(stock=total, updated_at=timezone.now())
+                aggregates.product_changed((category_id, price, stock), (category_id, price, total))
+                changed.append(product_id)
+            _rebalance(product_id, shards)
+        if changed:
+            record_changes(changed)
+            evict_products(changed)
+            transaction.on_commit(invalidate_catalog)
+    return changed
+
+
+def _sync_pending():
+    close_old_connections()
+    try:
+        with _pending_lock:
+            product_ids = list(_pending)
+            _pending.clear()
+        if product_ids:
+            sync_stock(product_ids)
+    finally:
+        connection.close()
+
+
+def schedule_sync(product_ids):
+    """
+    Queue a background sync once the current transaction commits. Products
+    already queued are not queued again, so a burst of checkouts on one
+    product costs a single sync.
+    """
+    def submit():
+        with _pending_lock:
+            new = set(product_ids) - _pending
+            _pending.update(product_ids)
+        if new:
+            _executor.submit(_sync_pending)
+    transaction.on_commit(submit)
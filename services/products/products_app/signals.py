@@ -0,0 +1,195 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import Category, Product
+from . import search
+from .images import schedule_release, schedule_variants
+from . import aggregates
+from .inventory import record_movements
+from .changes import record_category_products, record_changes
+from . import sharding
+from . import suggest
+from . import category_tree
+from .catalog_cache import invalidate_catalog
+from .detail_cache import evict_categories, evict_products
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    """
+    Any catalog write invalidates every cached catalog response, once it is
+    committed: a reader rebuilding an entry before then would cache the old data
+    """
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def evict_cached_product(sender, instance, **kwargs):
+    evict_products([instance.id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def evict_cached_category(sender, instance, **kwargs):
+    evict_categories([instance.id])
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, **kwargs):
+    """Keep the search index in sync with product writes"""
+    search.index_product(instance)
+
+
+@receiver(post_save, sender=Product)
+def refresh_image_variants(sender, instance, **kwargs):
+    """Queue derivative generation when a product's image changes"""
+    if instance.image:
+        if instance.image_variants.get('source') != instance.image.name:
+            schedule_variants(instance)
+    elif instance.image_variants:
+        Product.objects.filter(id=instance.id).update(image_variants={})
+
+
+@receiver(post_save, sender=Product)
+def release_replaced_image(sender, instance, **kwargs):
+    """A replaced image file is deleted once no other product uses it"""
+    stored_image = getattr(instance, '_stored_image', None)
+    if stored_image and stored_image != instance.image.name:
+        schedule_release([stored_image])
+
+
+@receiver(post_delete, sender=Product)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        schedule_release([instance.image.name])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    search.remove_product(instance.id)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    """A renamed category changes the indexed category name of its products"""
+    if not created:
+        search.rename_category(instance)
+
+
+@receiver(pre_save, sender=Category)
+def remember_stored_parent(sender, instance, **kwargs):
+    instance._stored_parent = None
+    if instance.pk:
+        instance._stored_parent = Category.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def update_category_tree(sender, instance, created, **kwargs):
+    """Keep the closure table in line with the parent links"""
+    if created:
+        category_tree.add_category(instance.id, instance.parent_id)
+    elif instance.parent_id != getattr(instance, '_stored_parent', instance.parent_id):
+        category_tree.move_category(instance.id, instance.parent_id)
+
+
+@receiver(pre_delete, sender=Category)
+def unindex_category_products(sender, instance, **kwargs):
+    search.remove_category(instance.id)
+
+
+@receiver(pre_save, sender=Product)
+def remember_stored_state(sender, instance, **kwargs):
+    """Capture the stored category/price/stock and image so post_save handlers can apply deltas"""
+    instance._stored_state = instance._stored_image = None
+    if instance.pk:
+        if instance.stock_shards:
+            sharding.before_save(instance)
+        stored = Product.objects.filter(pk=instance.pk).values_list('category_id', 'price', 'stock', 'image').first()
+        if stored:
+            instance._stored_state, instance._stored_image = stored[:3], stored[3]
+
+
+@receiver(post_save, sender=Product)
+def update_category_aggregates(sender, instance, **kwargs):
+    aggregates.product_changed(
+        getattr(instance, '_stored_state', None),
+        (instance.category_id, instance.price, instance.stock)
+    )
+
+
+@receiver(pre_delete, sender=Product)
+def remember_deleted_state(sender, instance, **kwargs):
+    """The in-memory instance may be stale, so read the stored values"""
+    instance._stored_state = (
+        Product.objects.filter(pk=instance.pk).values_list('category_id', 'price', 'stock').first()
+    )
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_category_aggregates(sender, instance, **kwargs):
+    aggregates.product_changed(getattr(instance, '_stored_state', None), None)
+
+
+@receiver(post_save, sender=Product)
+def record_stock_movement(sender, instance, created, **kwargs):
+    """
+    Append a ledger movement for stock changed through save(). Callers may set
+    _movement_reason / _movement_reference on the instance before saving.
+    """
+    stock = int(instance.stock)
+    previous = getattr(instance, '_stored_state', None)
+    delta = stock - (previous[2] if previous else 0)
+    reason = 'initial' if created else getattr(instance, '_movement_reason', 'adjust')
+    record_movements(
+        [(instance.id, delta, stock)],
+        reason,
+        getattr(instance, '_movement_reference', '')
+    )
+
+
+@receiver(post_save, sender=Product)
+def record_saved_product_change(sender, instance, **kwargs):
+    record_changes([instance.id])
+
+
+@receiver(post_delete, sender=Product)
+def record_deleted_product_change(sender, instance, **kwargs):
+    record_changes([instance.id], 'delete')
+
+
+@receiver(post_save, sender=Category)
+def record_category_change(sender, instance, created, **kwargs):
+    if not created:
+        record_category_products(instance.id)
+
+
+@receiver(post_save, sender=Product)
+def reset_stock_shards(sender, instance, **kwargs):
+    """An explicitly set stock on a sharded product replaces the shard counts"""
+    if getattr(instance, '_reset_shards', False):
+        sharding.reset_stock(instance.id, int(instance.stock))
+        instance._reset_shards = False
+
+
+@receiver(post_save, sender=Product)
+def suggest_saved_product(sender, instance, **kwargs):
+    suggest.product_saved(instance.id, instance.name, instance.category_id)
+
+
+@receiver(post_delete, sender=Product)
+def unsuggest_deleted_product(sender, instance, **kwargs):
+    suggest.product_deleted(instance.id)
+
+
+@receiver(post_save, sender=Category)
+def suggest_saved_category(sender, instance, **kwargs):
+    suggest.category_saved(instance.id, instance.name)
+
+
+@receiver(post_delete, sender=Category)
+def unsuggest_deleted_category(sender, instance, **kwargs):
+    suggest.category_deleted(instance.id)
@@ -63,10 +63,20 @@ async function deleteCategory(categoryId) {
 }
 
 // Product API Functions
-async function getProducts(categoryId = null) {
-    const endpoint = categoryId 
-        ? `/api/products/product?category_id=${categoryId}`
-        : '/api/products/product';
+// Pass `page` ({ limit, cursor }) to fetch one page: data is then { results, next }
+async function getProducts(categoryId = null, page = null) {
+    const params = new URLSearchParams();
+    if (categoryId) {
+        params.append('category_id', categoryId);
+    }
+    if (page) {
+        params.append('limit', page.limit);
+        if (page.cursor) {
+            params.append('cursor', page.cursor);
+        }
+    }
+    const query = params.toString();
+    const endpoint = query ? `/api/products/product?${query}` : '/api/products/product';
     return apiCall(endpoint, 'GET');
 }
 
@@ -1,6 +1,9 @@
 // Products Browse Page JavaScript
 
+const PRODUCTS_PAGE_SIZE = 24;
+
 let currentCategoryId = null;
+let nextCursor = null;
 
 async function loadCategories() {
     const result = await getCategories();
@@ -24,30 +27,54 @@ async function loadCategories() {
     }
 }
 
-async function loadProducts(categoryId = null) {
-    const result = await getProducts(categoryId);
+async function loadProducts(categoryId = null, cursor = null) {
+    const result = await getProducts(categoryId, { limit: PRODUCTS_PAGE_SIZE, cursor });
     
     if (result.success) {
         const productsGrid = document.getElementById('products-grid');
-        const products = result.data;
+        const products = result.data.results;
         
-        if (products.length === 0) {
-            productsGrid.innerHTML = '<p style="grid-column: 1/-1; text-align: center; color: #999;">No products available</p>';
+        // A new category selection started while this page was in flight
+        if (categoryId !== currentCategoryId) {
             return;
         }
         
-        productsGrid.innerHTML = '';
+        if (!cursor) {
+            productsGrid.innerHTML = '';
+        }
+        
+        if (!cursor && products.length === 0) {
+            productsGrid.innerHTML = '<p style="grid-column: 1/-1; text-align: center; color: #999;">No products available</p>';
+        }
         
-        // Group products by category for display (max 4 per row)
         products.forEach(product => {
             const productCard = createProductCard(product);
             productsGrid.appendChild(productCard);
         });
+        
+        nextCursor = result.data.next;
+        updateLoadMoreButton();
     } else {
         showNotification('Error loading products', 'error');
     }
 }
 
+function updateLoadMoreButton() {
+    let loadMoreBtn = document.getElementById('load-more-btn');
+    if (!loadMoreBtn) {
+        loadMoreBtn = document.createElement('button');
+        loadMoreBtn.id = 'load-more-btn';
+        loadMoreBtn.className = 'category-btn';
+        loadMoreBtn.textContent = 'Load More';
+        loadMoreBtn.style.margin = '20px auto 0';
+        // Without a cursor loadProducts() would start over from the first page
+        loadMoreBtn.addEventListener('click', () => nextCursor && loadProducts(currentCategoryId, nextCursor));
+        document.getElementById('products-grid').after(loadMoreBtn);
+    }
+    // An inline display overrides the hidden attribute, so toggle display itself
+    loadMoreBtn.style.display = nextCursor ? 'block' : 'none';
+}
+
 function createProductCard(product) {
     const card = document.createElement('div');
     card.className = 'product-card';
@@ -119,7 +146,7 @@ function selectCategory(categoryId) {
     }
     
     currentCategoryId = categoryId || null;
-    loadProducts(categoryId || null);
+    loadProducts(currentCategoryId);
 }
 
 // Initialize page
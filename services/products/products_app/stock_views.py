@@ -1,8 +1,49 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Product
+from .models import Product, StockAdjustment
+from .catalog_cache import invalidate_catalog
+from .detail_cache import evict_products
+from .aggregates import stock_adjusted
+from .inventory import record_movements
+from .changes import record_changes
+from . import sharding
+from . import suggest
+
+MAX_ADJUST_ITEMS = 100
+ADJUST_REASONS = ('order', 'cancel', 'adjust')
+# Reasons applied at most once per reference
+IDEMPOTENT_REASONS = ('order', 'cancel')
+
+
+class StockAdjustmentFailed(Exception):
+    """Raised inside the adjustment transaction to roll every item back"""
+
+    def __init__(self, results):
+        super().__init__('Stock adjustment failed')
+        self.results = results
+
+
+def parse_adjustments(items):
+    """Validate [{product_id, delta}, ...] and return a list of (product_id, delta)"""
+    if not isinstance(items, list) or not items:
+        raise ValueError('items must be a non-empty list')
+    if len(items) > MAX_ADJUST_ITEMS:
+        raise ValueError(f'At most {MAX_ADJUST_ITEMS} items can be adjusted at once')
+
+    adjustments = []
+    for item in items:
+        try:
+            product_id = int(item['product_id'])
+            delta = int(item['delta'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Each item needs an integer product_id and delta')
+        adjustments.append((product_id, delta))
+    return adjustments
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
@@ -16,8 +57,144 @@ def update_stock(request, product_id):
             return Response({'error': 'Stock value required'}, status=status.HTTP_400_BAD_REQUEST)
         
         product.stock = new_stock
-        product.save()
+        product._movement_reason = 'adjust'
+        product._movement_reference = request.data.get('reference', '')
+        with transaction.atomic():
+            product.save()
         
         return Response({'message': 'Stock updated', 'stock': product.stock}, status=status.HTTP_200_OK)
     except Product.DoesNotExist:
         return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def adjust_stock(request):
+    """
+    Apply relative stock changes atomically (for order service).
+    Body: {"items": [{"product_id": 1, "delta": -2}, ...],
+           "reason": "order" | "cancel" | "adjust" (optional), "reference": "..." (optional),
+           "if_reserved": true (optional, cancel only)}
+    Either every delta is applied or none is; stock never goes below zero.
+    An order or cancel adjustment is applied once per reference: repeating
+    it answers 200 with "replayed": true and changes nothing. With
+    if_reserved, a cancel is only applied if an order adjustment was
+    recorded under the same reference, and an order adjustment arriving
+    after such a cancel is refused.
+    """
+    if not isinstance(request.data, dict):
+        return Response({'error': 'Request body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        adjustments = parse_adjustments(request.data.get('items'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    reason = request.data.get('reason', 'adjust')
+    if reason not in ADJUST_REASONS:
+        return Response(
+            {'error': f'reason must be one of: {", ".join(ADJUST_REASONS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    reference = request.data.get('reference') or ''
+    if not isinstance(reference, str) or len(reference) > 100:
+        return Response({'error': 'reference must be a string of at most 100 characters'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            if reason in IDEMPOTENT_REASONS and reference:
+                # Inserted first: on SQLite this takes the write lock, so a
+                # concurrent retry waits for this request and is then replayed
+                try:
+                    with transaction.atomic():
+                        StockAdjustment.objects.create(reason=reason, reference=reference)
+                except IntegrityError:
+                    return Response(
+                        {'message': 'Already applied', 'replayed': True, 'results': []},
+                        status=status.HTTP_200_OK
+                    )
+                recorded = set(
+                    StockAdjustment.objects.filter(reference=reference).values_list('reason', flat=True)
+                )
+                if reason == 'order' and 'cancel' in recorded:
+                    # Released before it arrived (the caller gave up on it); never take the stock
+                    raise StockAdjustmentFailed([
+                        {'product_id': product_id, 'delta': delta, 'error': 'Reservation already released'}
+                        for product_id, delta in adjustments
+                    ])
+                if reason == 'cancel' and request.data.get('if_reserved') and 'order' not in recorded:
+                    # The cancel record stays, so a late reservation is refused
+                    return Response({'message': 'Nothing reserved', 'results': []}, status=status.HTTP_200_OK)
+
+            now = timezone.now()
+            product_ids = [product_id for product_id, _ in adjustments]
+            sharded = dict(
+                Product.objects.filter(id__in=product_ids, stock_shards__gt=0).values_list('id', 'stock_shards')
+            )
+            failed = []
+            for product_id, delta in adjustments:
+                if product_id in sharded:
+                    updated = sharding.adjust(product_id, sharded[product_id], delta)
+                else:
+                    updated = Product.objects.filter(id=product_id, stock__gte=-delta).update(
+                        stock=F('stock') + delta,
+                        updated_at=now
+                    )
+                if not updated:
+                    failed.append(product_id)
+
+            if failed:
+                existing = set(Product.objects.filter(id__in=failed).values_list('id', flat=True))
+                raise StockAdjustmentFailed([
+                    {
+                        'product_id': product_id,
+                        'delta': delta,
+                        'error': 'Insufficient stock' if product_id in existing else 'Product not found',
+                    }
+                    for product_id, delta in adjustments if product_id in failed
+                ])
+
+            # Sharded products reach Product.stock, aggregates and the feed
+            # through the background shard sync instead
+            rows = list(
+                Product.objects.filter(id__in=product_ids, stock_shards=0)
+                .values_list('id', 'category_id', 'price', 'stock')
+            )
+            stock = {row[0]: row[3] for row in rows}
+            stock.update(sharding.shard_totals(sharded))
+            totals = {}
+            for product_id, delta in adjustments:
+                totals[product_id] = totals.get(product_id, 0) + delta
+            stock_adjusted(rows, totals)
+
+            # Walk back from the final stock to get each movement's stock_after
+            running = dict(stock)
+            entries = []
+            for product_id, delta in reversed(adjustments):
+                entries.append((product_id, delta, running[product_id]))
+                running[product_id] -= delta
+            record_movements(reversed(entries), reason, reference)
+            if reason in ('order', 'cancel'):
+                suggest.products_sold({product_id: -delta for product_id, delta in totals.items()})
+            unsharded = [row[0] for row in rows]
+            record_changes(unsharded)
+            # update() bypasses the model signals, so invalidate explicitly
+            transaction.on_commit(invalidate_catalog)
+            evict_products(unsharded)
+            if sharded:
+                sharding.schedule_sync(sharded)
+    except StockAdjustmentFailed as e:
+        return Response(
+            {'error': 'Stock adjustment failed', 'results': e.results},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    return Response(
+        {
+            'message': 'Stock adjusted',
+            'results': [
+                {'product_id': product_id, 'delta': delta, 'stock': stock[product_id]}
+                for product_id, delta in adjustments
+            ],
+        },
+        status=status.HTTP_200_OK
+    )
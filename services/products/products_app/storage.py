@@ -0,0 +1,75 @@
+"""
+Content-addressed file storage for product images.
+
+An upload is streamed to a temporary file in its target directory while
+being hashed, then renamed to <sha256 of the content><extension>. A digest
+that is already stored is not written again, so the same photo uploaded for
+many products, or uploaded again on edit, occupies the disk once. Since a
+name always denotes the same bytes, media_views serves these files as
+immutable.
+
+Files are shared between products, so they are only removed through
+images.release_images(), which checks that no product still uses them.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CONTENT_ADDRESSED_RE = re.compile(r'(?:^|/)[0-9a-f]{64}(?:_[a-z]+)?\.[A-Za-z0-9]+$')
+
+
+def is_content_addressed(path):
+    """True for stored names derived from a SHA-256 digest (including image derivatives)"""
+    return bool(CONTENT_ADDRESSED_RE.search(path))
+
+
+def content_name(name, digest):
+    """The content-addressed name for `name` (for its directory and extension) with the given digest"""
+    directory, filename = posixpath.split(name.replace('\\', '/'))
+    extension = os.path.splitext(filename)[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]+', extension):
+        extension = '.bin'
+    return posixpath.join(directory, digest + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files after the SHA-256 of their content"""
+
+    def get_available_name(self, name, max_length=None):
+        # _save() picks the final name from the content; an existing file with
+        # that name already holds the same bytes, so no suffix is ever needed
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+
+            name = content_name(name, digest.hexdigest())
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temp_path)
+            else:
+                # mkstemp creates the file owner-only
+                os.chmod(temp_path, self.file_permissions_mode if self.file_permissions_mode is not None else 0o644)
+                os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+
+product_image_storage = ContentAddressedStorage()
@@ -0,0 +1,308 @@
+"""
+Typeahead suggestions from an in-memory prefix index.
+
+Product and category names are normalized (accents stripped, case folded,
+punctuation collapsed) and every word start becomes a key in a sorted array,
+so "pho" finds both "Phone case" and "Smart phone". A lookup bisects to the
+first key with the prefix and ranks the matching run by a popularity score:
+units sold for products, product count for categories. Prefixes with long
+runs ("a", "pro") instead keep their best keys in a ranking computed when the
+index is built and updated in place as entries and sales change, so a lookup
+never ranks more than SCAN_LIMIT keys.
+
+Each worker process holds its own index. It is built on first use (wsgi.py
+warms it at startup), kept current by the signal handlers after each commit,
+and rebuilt in the background once it is older than SUGGEST_INDEX_MAX_AGE so
+writes made by other processes show up too.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from heapq import nsmallest
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Sum
+from .filters import visible_categories, visible_products
+from .models import InventoryMovement
+
+MAX_AGE = getattr(settings, 'SUGGEST_INDEX_MAX_AGE', 300)
+# Prefixes matching more keys than this keep a precomputed ranking;
+# shorter runs are cheap enough to rank on every lookup
+SCAN_LIMIT = 256
+# Ranked results served from a kept ranking; covers the API's largest limit
+TOP_K = 20
+# Keys kept per ranking, with slack so removals and returns rarely force a re-rank
+TOP_CAPACITY = 2 * TOP_K
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text):
+    """Lowercase, accent-free, single-spaced words"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_WORD_RE.findall(text.casefold()))
+
+
+def _terms(name):
+    words = normalize(name).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+        self._scores = {}
+        # popular prefix -> its best keys, best first
+        self._top = {}
+        # length of the longest prefix in _top
+        self._depth = 0
+        self._lock = threading.Lock()
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls):
+        """Load every product and category name with its popularity"""
+        index = cls()
+        sold = (
+            InventoryMovement.objects.filter(reason__in=['order', 'cancel'])
+            .values('product_id')
+            .annotate(total=Sum('delta'))
+            .values_list('product_id', 'total')
+        )
+        index._scores = {('product', product_id): -total for product_id, total in sold}
+        for category_id, name, product_count in visible_categories().values_list('id', 'name', 'product_count'):
+            index._scores[('category', category_id)] = product_count
+            index._put(('category', category_id), name, None)
+        for product_id, name, category_id in visible_products().values_list('id', 'name', 'category_id').iterator():
+            index._put(('product', product_id), name, category_id)
+        index._keys.sort()
+        index.precompute()
+        return index
+
+    def _rank_key(self, key):
+        return (-self._scores.get(key, 0), self._entries[key][0], key)
+
+    def _range(self, prefix):
+        """Positions in _keys of the run of terms starting with prefix"""
+        start = bisect_left(self._keys, (prefix,))
+        return start, bisect_left(self._keys, (prefix + '\U0010ffff',), start)
+
+    def _rank(self, start, end, limit):
+        """The `limit` most popular keys in _keys[start:end]"""
+        matches = {key for _, key in self._keys[start:end]}
+        return nsmallest(limit, matches, key=self._rank_key)
+
+    def _keep(self, prefix, ranked):
+        self._top[prefix] = ranked
+        self._depth = max(self._depth, len(prefix))
+        return ranked
+
+    def precompute(self):
+        """Rank every prefix whose run is longer than SCAN_LIMIT"""
+        self._top, self._depth = {}, 0
+        # Rank every entry once, so each run is ranked by comparing integers
+        order = sorted(self._entries, key=self._rank_key)
+        position = {key: i for i, key in enumerate(order)}
+        terms = [term for term, _ in self._keys]
+        positions = [position[key] for _, key in self._keys]
+
+        pending = list(set(term[:1] for term in terms))
+        while pending:
+            prefix = pending.pop()
+            start, end = self._range(prefix)
+            if end - start <= SCAN_LIMIT:
+                continue
+            self._keep(prefix, [order[i] for i in nsmallest(TOP_CAPACITY, set(positions[start:end]))])
+            length = len(prefix) + 1
+            pending.extend({term[:length] for term in terms[start:end] if len(term) >= length})
+
+    def _ranked_prefixes(self, key):
+        """The prefixes in _top that the entry's words start with"""
+        entry = self._entries.get(key)
+        if entry is None or not self._top:
+            return set()
+        return {
+            term[:length]
+            for term in entry[2]
+            for length in range(1, min(len(term), self._depth) + 1)
+            if term[:length] in self._top
+        }
+
+    def _rerank(self, key, prefixes):
+        """
+        Move a key whose entry or score changed within the kept rankings.
+        Each ranking holds the best keys of its run; anything outside it
+        ranks below its last key, so the key can only be placed ahead of
+        that. A ranking left shorter than TOP_K is dropped and rebuilt on
+        its next lookup.
+        """
+        if not prefixes:
+            return
+        rank = self._rank_key(key)
+        for prefix in prefixes:
+            ranked = self._top[prefix]
+            if key in ranked:
+                ranked.remove(key)
+            if ranked and rank < self._rank_key(ranked[-1]):
+                insort(ranked, key, key=self._rank_key)
+                del ranked[TOP_CAPACITY:]
+            if len(ranked) < TOP_K:
+                del self._top[prefix]
+
+    def _put(self, key, name, category_id, sort=False):
+        terms = _terms(name)
+        self._entries[key] = (name, category_id, terms)
+        for term in terms:
+            if sort:
+                insort(self._keys, (term, key))
+            else:
+                self._keys.append((term, key))
+
+    def _drop(self, key):
+        for prefix in self._ranked_prefixes(key):
+            ranked = self._top[prefix]
+            if key in ranked:
+                ranked.remove(key)
+                if len(ranked) < TOP_K:
+                    del self._top[prefix]
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for term in entry[2]:
+            position = bisect_left(self._keys, (term, key))
+            if position < len(self._keys) and self._keys[position] == (term, key):
+                del self._keys[position]
+
+    def add(self, kind, object_id, name, category_id=None):
+        """Insert or replace a product or category"""
+        key = (kind, object_id)
+        with self._lock:
+            self._drop(key)
+            self._put(key, name, category_id, sort=True)
+            self._rerank(key, self._ranked_prefixes(key))
+
+    def remove(self, kind, object_id):
+        with self._lock:
+            self._drop((kind, object_id))
+
+    def remove_category(self, category_id):
+        """Drop a category together with every product filed under it"""
+        with self._lock:
+            self._drop(('category', category_id))
+            for key in [key for key, entry in self._entries.items() if entry[1] == category_id]:
+                self._drop(key)
+
+    def add_sales(self, units):
+        """Bump product popularity by {product_id: units sold} (negative for returns)"""
+        with self._lock:
+            for product_id, count in units.items():
+                key = ('product', product_id)
+                self._scores[key] = self._scores.get(key, 0) + count
+                self._rerank(key, self._ranked_prefixes(key))
+
+    def lookup(self, prefix, limit):
+        """Best-scoring products and categories with a word starting with `prefix`"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            ranked = self._top.get(prefix)
+            if ranked is None or limit > len(ranked):
+                start, end = self._range(prefix)
+                if end - start > SCAN_LIMIT and limit <= TOP_K:
+                    # Became popular since the last precompute(), or lost its ranking
+                    ranked = self._keep(prefix, self._rank(start, end, TOP_CAPACITY))
+                else:
+                    ranked = self._rank(start, end, limit)
+            results = []
+            for kind, object_id in ranked[:limit]:
+                name, category_id, _ = self._entries[(kind, object_id)]
+                result = {'type': kind, 'id': object_id, 'name': name}
+                if kind == 'product':
+                    category = self._entries.get(('category', category_id))
+                    result['category_id'] = category_id
+                    result['category_name'] = category[0] if category else None
+                results.append(result)
+            return results
+
+
+_index = None
+_index_lock = threading.Lock()
+_rebuilding = threading.Event()
+
+
+def _rebuild():
+    global _index
+    close_old_connections()
+    try:
+        _index = SuggestIndex.build()
+    finally:
+        _rebuilding.clear()
+        connection.close()
+
+
+def get_index():
+    """The process-wide index, built on first use and refreshed in the background"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SuggestIndex.build()
+    elif time.monotonic() - _index.built_at > MAX_AGE and not _rebuilding.is_set():
+        _rebuilding.set()
+        threading.Thread(target=_rebuild, name='suggest-index', daemon=True).start()
+    return _index
+
+
+def warm():
+    """Build the index now; on a database that is not migrated yet, leave it to the first lookup"""
+    try:
+        get_index()
+    except DatabaseError:
+        pass
+
+
+def suggest(prefix, limit):
+    return get_index().lookup(prefix, limit)
+
+
+def _after_commit(apply):
+    """Apply an index update once the transaction commits, if the index is loaded"""
+    def run():
+        if _index is not None:
+            apply(_index)
+    transaction.on_commit(run)
+
+
+def product_saved(product_id, name, category_id):
+    _after_commit(lambda index: index.add('product', product_id, name, category_id))
+
+
+def products_saved(rows):
+    """Bulk variant of product_saved for (product_id, name, category_id) rows"""
+    rows = list(rows)
+
+    def apply(index):
+        for product_id, name, category_id in rows:
+            index.add('product', product_id, name, category_id)
+    _after_commit(apply)
+
+
+def product_deleted(product_id):
+    _after_commit(lambda index: index.remove('product', product_id))
+
+
+def category_saved(category_id, name):
+    _after_commit(lambda index: index.add('category', category_id, name))
+
+
+def category_deleted(category_id):
+    _after_commit(lambda index: index.remove_category(category_id))
+
+
+def products_sold(units):
+    _after_commit(lambda index: index.add_sales(units))
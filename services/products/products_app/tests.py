@@ -1,3 +1,618 @@
-from django.test import TestCase
+import functools
+import json
+import os
+import tempfile
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .authentication import RemoteUser
+from .aggregates import recompute_categories
+from .catalog_cache import catalog_version
+from . import category_deletion, sharding, views
+from .category_tree import rebuild_closure
+from .media_views import RangeNotSatisfiable, parse_range
+from .models import Category, CategoryClosure, CategoryDeletion, Product, StockShard
+from .suggest import SuggestIndex
 
-# Create your tests here.
+
+def admin_client():
+    client = APIClient()
+    client.force_authenticate(RemoteUser({'id': 1, 'username': 'admin', 'email': 'admin@example.com', 'is_staff': True}))
+    return client
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        self.category = Category.objects.create(name='Phones')
+
+    def upload(self, filename, data):
+        return self.client.post(
+            '/api/products/product/import',
+            {'file': SimpleUploadedFile(filename, data)},
+            format='multipart'
+        )
+
+    def test_reports_invalid_rows(self):
+        response = self.upload(
+            'feed.csv',
+            b'name,price,category,stock\nNokia,10.50,Phones,3\nBad,-1,Phones,1\nOther,1,Nope,1\n'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['created'], report['failed']), (1, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3])
+        self.assertIn('price', report['errors'][0]['errors'])
+        self.assertIn('category', report['errors'][1]['errors'])
+        self.assertTrue(Product.objects.filter(name='Nokia', stock=3).exists())
+
+    def test_duplicate_id_in_chunk_is_a_row_error(self):
+        response = self.upload(
+            'feed.ndjson',
+            b'{"id": 100, "name": "First", "price": "1", "category": "Phones"}\n'
+            b'{"id": 100, "name": "Second", "price": "2", "category": "Phones"}\n'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['created'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['row'], 2)
+        self.assertIn('id', report['errors'][0]['errors'])
+        self.assertEqual(Product.objects.get(id=100).name, 'First')
+
+
+class BulkUpdateTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        self.category = Category.objects.create(name='Phones')
+        self.product = Product.objects.create(name='Nokia', price='10.00', stock=5, category=self.category)
+
+    def bulk(self, update):
+        return self.client.patch(
+            '/api/products/product/bulk',
+            {'filter': {'category_id': self.category.id}, 'update': update},
+            format='json'
+        )
+
+    def test_applies_expressions(self):
+        response = self.bulk({'price': {'multiply': '0.9'}, 'stock': {'add': 2}})
+
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual((str(self.product.price), self.product.stock), ('9.00', 7))
+
+    def test_rejects_invalid_expressions(self):
+        for update in (
+            {'category': {'set': 'abc'}},
+            {'category': {'set': 999}},
+            {'price': {'multiply': '-1'}},
+            {'price': {'set': 'cheap'}},
+            {'stock': {'set': '5'}},
+            {'stock': {'multiply': 2}},
+            {'name': {'set': 'x'}},
+            {},
+        ):
+            with self.subTest(update=update):
+                response = self.bulk(update)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+        self.product.refresh_from_db()
+        self.assertEqual((str(self.product.price), self.product.stock), ('10.00', 5))
+
+    def test_ids_restrict_the_filter(self):
+        others = [
+            Product.objects.create(name=name, price='10.00', stock=5, category=self.category)
+            for name in ('Moto', 'Pixel')
+        ]
+        ids = f'{self.product.id},{others[0].id}'
+
+        response = self.client.patch('/api/products/product/bulk', {
+            'filter': {'category_id': self.category.id, 'ids': ids},
+            'update': {'price': {'set': '1.00'}},
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        prices = dict(Product.objects.values_list('name', 'price'))
+        self.assertEqual({name: str(price) for name, price in prices.items()}, {'Nokia': '1.00', 'Moto': '1.00', 'Pixel': '10.00'})
+
+    def test_rejects_invalid_ids(self):
+        for ids in ('1,x', [str(self.product.id), 'x'], '1.5'):
+            with self.subTest(ids=ids):
+                response = self.client.patch('/api/products/product/bulk', {
+                    'filter': {'category_id': self.category.id, 'ids': ids},
+                    'update': {'price': {'set': '1.00'}},
+                }, format='json')
+                self.assertEqual(response.status_code, 400)
+
+        self.product.refresh_from_db()
+        self.assertEqual(str(self.product.price), '10.00')
+
+    def test_negative_values_outside_the_update_do_not_block_it(self):
+        Product.objects.create(name='Oversold', price='10.00', stock=-2, category=self.category)
+
+        response = self.bulk({'price': {'multiply': '0.5'}})
+
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual(str(self.product.price), '5.00')
+
+    def test_refuses_to_take_stock_below_zero(self):
+        response = self.bulk({'stock': {'add': -6}})
+
+        self.assertEqual(response.status_code, 400)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+
+
+class CatalogCacheInvalidationTests(TestCase):
+    def test_invalidates_on_commit_only(self):
+        category = Category.objects.create(name='Phones')
+        version = catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Product.objects.create(name='Nokia', price='10.00', category=category)
+                self.assertEqual(catalog_version(), version)
+        self.assertNotEqual(catalog_version(), version)
+
+
+class SuggestIndexTests(TestCase):
+    def setUp(self):
+        self.index = SuggestIndex()
+        for product_id in range(1, 601):
+            self.index.add('product', product_id, f'Cable {product_id:04d}')
+
+    def test_ranks_every_match_of_a_short_prefix(self):
+        self.index.add_sales({600: 5})
+
+        self.assertEqual(self.index.lookup('c', 1)[0]['id'], 600)
+
+    def test_sales_refresh_a_kept_ranking(self):
+        self.assertEqual(self.index.lookup('ca', 1)[0]['id'], 1)
+
+        self.index.add_sales({599: 3})
+
+        self.assertEqual(self.index.lookup('ca', 1)[0]['id'], 599)
+
+
+class PrecomputedSuggestTests(TestCase):
+    def setUp(self):
+        self.index = SuggestIndex()
+        for product_id in range(1, 601):
+            self.index._scores[('product', product_id)] = product_id % 50
+            self.index._put(('product', product_id), f'Cable {product_id:04d}', None)
+        self.index._keys.sort()
+        self.index.precompute()
+
+    def top(self, prefix, limit=3):
+        return [result['id'] for result in self.index.lookup(prefix, limit)]
+
+    def test_long_runs_are_ranked_when_built(self):
+        self.assertIn('c', self.index._top)
+        self.assertEqual(self.top('c'), [49, 99, 149])
+
+    def test_rankings_follow_sales_returns_and_removals(self):
+        self.index.add_sales({600: 100})
+        self.assertEqual(self.top('ca'), [600, 49, 99])
+
+        self.index.add_sales({600: -100, 49: -49})
+        self.assertEqual(self.top('ca'), [99, 149, 199])
+
+        self.index.remove('product', 99)
+        self.index.add('product', 601, 'Cabinet')
+        self.index.add_sales({601: 80})
+        self.assertEqual(self.top('cab'), [601, 149, 199])
+
+
+class CategoryAggregateTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        self.category = Category.objects.create(name='Phones')
+        self.products = [
+            Product.objects.create(name=name, price='10.00', stock=stock, category=self.category)
+            for name, stock in (('Nokia', 0), ('Moto', 3))
+        ]
+
+    def test_stock_adjustment_updates_aggregates(self):
+        response = self.client.post('/api/products/stock/adjust', {
+            'items': [{'product_id': self.products[0].id, 'delta': 2}, {'product_id': self.products[1].id, 'delta': -3}],
+            'reason': 'adjust',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.category.refresh_from_db()
+        self.assertEqual(
+            (self.category.product_count, self.category.in_stock_count, str(self.category.stock_value)),
+            (2, 1, '20.00')
+        )
+        self.assertEqual(recompute_categories([self.category.id]), [])
+
+    def test_recompute_fixes_drift(self):
+        Category.objects.filter(id=self.category.id).update(product_count=7)
+
+        with self.assertNumQueries(3):
+            changed = recompute_categories()
+            self.assertEqual([category.name for category in changed], ['Phones'])
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.product_count, 2)
+
+
+class StockAdjustmentTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        category = Category.objects.create(name='Phones')
+        self.plenty = Product.objects.create(name='Nokia', price='10.00', stock=10, category=category)
+        self.scarce = Product.objects.create(name='Moto', price='10.00', stock=1, category=category)
+
+    def adjust(self, items):
+        return self.client.post('/api/products/stock/adjust', {'items': items, 'reason': 'order'}, format='json')
+
+    def test_insufficient_stock_is_a_conflict_and_changes_nothing(self):
+        response = self.adjust([
+            {'product_id': self.plenty.id, 'delta': -2},
+            {'product_id': self.scarce.id, 'delta': -2},
+        ])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['results'], [
+            {'product_id': self.scarce.id, 'delta': -2, 'error': 'Insufficient stock'},
+        ])
+        self.plenty.refresh_from_db()
+        self.scarce.refresh_from_db()
+        self.assertEqual((self.plenty.stock, self.scarce.stock), (10, 1))
+
+    def test_unknown_product_is_a_conflict(self):
+        response = self.adjust([{'product_id': 999, 'delta': -1}])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['results'][0]['error'], 'Product not found')
+
+    def test_repeated_reservation_is_applied_once(self):
+        items = [{'product_id': self.plenty.id, 'delta': -2}]
+        body = {'items': items, 'reason': 'order', 'reference': 'ORD-1'}
+
+        first = self.client.post('/api/products/stock/adjust', body, format='json')
+        retry = self.client.post('/api/products/stock/adjust', body, format='json')
+
+        self.assertEqual((first.status_code, retry.status_code), (200, 200))
+        self.assertTrue(retry.json()['replayed'])
+        self.plenty.refresh_from_db()
+        self.assertEqual(self.plenty.stock, 8)
+
+    def test_release_gives_back_only_what_was_reserved(self):
+        reserve = {'items': [{'product_id': self.plenty.id, 'delta': -2}], 'reason': 'order', 'reference': 'ORD-1'}
+        release = {'items': [{'product_id': self.plenty.id, 'delta': 2}], 'reason': 'cancel', 'if_reserved': True}
+
+        self.client.post('/api/products/stock/adjust', reserve, format='json')
+        self.client.post('/api/products/stock/adjust', {**release, 'reference': 'ORD-1'}, format='json')
+        self.client.post('/api/products/stock/adjust', {**release, 'reference': 'ORD-2'}, format='json')
+
+        self.plenty.refresh_from_db()
+        self.assertEqual(self.plenty.stock, 10)
+
+    def test_reservation_after_its_release_is_refused(self):
+        self.client.post('/api/products/stock/adjust', {
+            'items': [{'product_id': self.plenty.id, 'delta': 2}], 'reason': 'cancel', 'reference': 'ORD-1', 'if_reserved': True,
+        }, format='json')
+
+        response = self.client.post('/api/products/stock/adjust', {
+            'items': [{'product_id': self.plenty.id, 'delta': -2}], 'reason': 'order', 'reference': 'ORD-1',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['results'][0]['error'], 'Reservation already released')
+        self.plenty.refresh_from_db()
+        self.assertEqual(self.plenty.stock, 10)
+
+    def test_body_must_be_an_object(self):
+        response = self.client.post(
+            '/api/products/stock/adjust', [{'product_id': self.plenty.id, 'delta': -1}], format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_stock_can_reach_zero(self):
+        response = self.adjust([{'product_id': self.scarce.id, 'delta': -1}])
+
+        self.assertEqual(response.status_code, 200)
+        self.scarce.refresh_from_db()
+        self.assertEqual(self.scarce.stock, 0)
+
+
+class ProductListingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Phones')
+        self.products = [
+            Product.objects.create(name=f'Phone {i}', price='10.00', stock=1, category=category)
+            for i in range(3)
+        ]
+
+    def test_cursor_pages_through_every_product(self):
+        first = self.client.get('/api/products/product', {'limit': 2}).json()
+        second = self.client.get('/api/products/product', {'limit': 2, 'cursor': first['next']}).json()
+
+        ids = [product['id'] for product in first['results'] + second['results']]
+        self.assertEqual(sorted(ids), sorted(product.id for product in self.products))
+        self.assertIsNone(second['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ('garbage', '!!!', 'eyJ4IjogMX0'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/products/product', {'limit': 2, 'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_listing_etag_answers_not_modified(self):
+        etag = self.client.get('/api/products/product')['ETag']
+
+        response = self.client.get('/api/products/product', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].stock = 5
+            self.products[0].save()
+        response = self.client.get('/api/products/product', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_etag_answers_not_modified(self):
+        url = f'/api/products/product/{self.products[0].id}'
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class ProductExportTests(TestCase):
+    def test_exports_every_product_once_across_chunks(self):
+        category = Category.objects.create(name='Phones')
+        products = [
+            Product.objects.create(name=f'Phone {i}', price='10.00', stock=1, category=category)
+            for i in range(7)
+        ]
+        # Tied timestamps straddle the chunk boundaries
+        Product.objects.filter(id__in=[p.id for p in products[:5]]).update(updated_at=timezone.now())
+
+        with mock.patch.object(views, 'EXPORT_CHUNK_SIZE', 2):
+            response = APIClient().get('/api/products/product/export')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(sorted(json.loads(line)['id'] for line in lines), [p.id for p in products])
+
+
+class CategoryDeletionTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        self.category = Category.objects.create(name='Phones')
+        self.products = [
+            Product.objects.create(name=f'Phone {i}', price='10.00', stock=1, category=self.category)
+            for i in range(5)
+        ]
+        # Run jobs inline, on the test's own connection
+        for name, value in (
+            ('_executor', mock.Mock(submit=lambda fn, *args: fn(*args))),
+            ('close_old_connections', mock.Mock()),
+            ('BATCH_PAUSE', 0),
+        ):
+            patcher = mock.patch.object(category_deletion, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(category_deletion.connection, 'close')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def delete(self):
+        return self.client.delete(f'/api/products/category/{self.category.id}', QUERY_STRING='async=true')
+
+    def test_deletes_products_in_batches_then_the_category(self):
+        batches = mock.Mock(side_effect=functools.partial(category_deletion.delete_batch, batch_size=2))
+        with mock.patch.object(category_deletion, 'delete_batch', batches):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.delete()
+
+        self.assertEqual(response.status_code, 202)
+        # 2 + 2 + 1 products, then an empty batch
+        self.assertEqual(batches.call_count, 4)
+        job = CategoryDeletion.objects.get()
+        self.assertEqual((job.status, job.total, job.deleted), ('done', 5, 5))
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+    def test_category_and_products_are_hidden_while_deleting(self):
+        with self.captureOnCommitCallbacks():
+            self.delete()
+
+        self.assertEqual(self.client.get(f'/api/products/category/{self.category.id}').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/products/product/{self.products[0].id}').status_code, 404)
+        self.assertEqual(self.client.get('/api/products/product').json(), [])
+        self.assertEqual(Product.objects.count(), 5)
+
+    def test_failed_job_is_resumed_by_deleting_again(self):
+        with mock.patch.object(category_deletion, 'delete_batch', side_effect=DatabaseError('disk I/O error')):
+            with self.captureOnCommitCallbacks(execute=True):
+                first = self.delete()
+        self.assertEqual(CategoryDeletion.objects.get().status, 'failed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.delete()
+
+        self.assertEqual(second.json()['id'], first.json()['id'])
+        job = CategoryDeletion.objects.get()
+        self.assertEqual((job.status, job.deleted), ('done', 5))
+        self.assertFalse(Category.objects.exists())
+
+    def test_running_job_is_not_submitted_twice(self):
+        with self.captureOnCommitCallbacks():
+            self.delete()
+        CategoryDeletion.objects.update(status='running')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.delete()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(callbacks, [])
+
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        self.root = Category.objects.create(name='Electronics')
+        self.child = Category.objects.create(name='Phones', parent=self.root)
+        self.leaf = Category.objects.create(name='Smartphones', parent=self.child)
+        self.other = Category.objects.create(name='Gadgets')
+
+    def closure(self):
+        return set(CategoryClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+    def move(self, category, parent):
+        return self.client.put(
+            f'/api/products/category/{category.id}', {'parent': parent and parent.id}, format='json'
+        )
+
+    def test_moving_a_category_moves_its_subtree(self):
+        response = self.move(self.child, self.other)
+
+        self.assertEqual(response.status_code, 200)
+        moved = self.closure()
+        self.assertIn((self.other.id, self.leaf.id, 2), moved)
+        self.assertNotIn(self.root.id, {ancestor for ancestor, descendant, _ in moved if descendant == self.leaf.id})
+        # Same rows as rebuilding from the parent links
+        rebuild_closure()
+        self.assertEqual(moved, self.closure())
+
+    def test_moving_to_the_root(self):
+        self.move(self.child, None)
+
+        self.assertEqual(
+            {row for row in self.closure() if row[1] == self.leaf.id},
+            {(self.leaf.id, self.leaf.id, 0), (self.child.id, self.leaf.id, 1)}
+        )
+
+    def test_cycles_are_rejected(self):
+        before = self.closure()
+
+        for category, parent in ((self.root, self.leaf), (self.child, self.child)):
+            with self.subTest(category=category.name, parent=parent.name):
+                response = self.move(category, parent)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('parent', response.json())
+
+        self.assertEqual(self.closure(), before)
+        self.root.refresh_from_db()
+        self.assertIsNone(self.root.parent_id)
+
+
+class StockShardingTests(TestCase):
+    def setUp(self):
+        self.client = admin_client()
+        self.product = Product.objects.create(
+            name='Nokia', price='10.00', stock=8, category=Category.objects.create(name='Phones')
+        )
+        sharding.enable_sharding(self.product.id, 4)
+
+    def shards(self):
+        return list(StockShard.objects.filter(product=self.product).order_by('shard').values_list('stock', flat=True))
+
+    def adjust(self, delta):
+        with self.captureOnCommitCallbacks():
+            return self.client.post('/api/products/stock/adjust', {
+                'items': [{'product_id': self.product.id, 'delta': delta}], 'reason': 'order',
+            }, format='json')
+
+    def test_stock_is_split_across_shards(self):
+        self.assertEqual(self.shards(), [2, 2, 2, 2])
+
+    def test_adjust_reports_the_shard_total_until_synced(self):
+        response = self.adjust(-1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['stock'], 7)
+        self.assertEqual(sum(self.shards()), 7)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 8)
+
+        self.assertEqual(sharding.sync_stock([self.product.id]), [self.product.id])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+
+    def test_decrement_larger_than_any_shard_drains_several(self):
+        self.assertEqual(self.adjust(-5).status_code, 200)
+        self.assertEqual(sum(self.shards()), 3)
+
+        self.assertEqual(self.adjust(-4).status_code, 409)
+        self.assertEqual(sum(self.shards()), 3)
+
+    def test_sync_evens_out_the_shards(self):
+        self.adjust(-5)
+
+        sharding.sync_stock([self.product.id])
+
+        self.assertEqual(self.shards(), [1, 1, 1, 0])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        with open(os.path.join(media_root.name, 'f.bin'), 'wb') as f:
+            f.write(bytes(range(100)))
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_serves_file(self):
+        response = self.client.get('/media/f.bin')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+
+    def test_nul_byte_in_path_is_not_found(self):
+        self.assertEqual(self.client.get('/media/f.bin%00').status_code, 404)
+
+    def test_serves_a_byte_range(self):
+        response = self.client.get('/media/f.bin', HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+    def test_range_past_the_end_is_not_satisfiable(self):
+        response = self.client.get('/media/f.bin', HTTP_RANGE='bytes=200-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_if_range_only_honours_a_current_etag(self):
+        etag = self.client.get('/media/f.bin')['ETag']
+
+        current = self.client.get('/media/f.bin', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        stale = self.client.get('/media/f.bin', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(current.status_code, 206)
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(len(b''.join(stale.streaming_content)), 100)
+
+    def test_parse_range(self):
+        for header, expected in (
+            ('bytes=0-9', (0, 9)),
+            ('bytes=90-', (90, 99)),
+            ('bytes=-10', (90, 99)),
+            ('bytes=95-200', (95, 99)),
+            ('bytes=9-0', None),
+            ('bytes=0-1,5-6', None),
+            ('items=0-9', None),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 100), expected)
+        for header in ('bytes=-0', 'bytes=100-'):
+            with self.subTest(header=header):
+                with self.assertRaises(RangeNotSatisfiable):
+                    parse_range(header, 100)
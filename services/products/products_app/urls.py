@@ -8,11 +8,28 @@ urlpatterns = [
     # Categories
     path('api/products/category', views.category_list_create, name='category_list_create'),
     path('api/products/category/<int:category_id>', views.category_detail, name='category_detail'),
+    path('api/products/category/deletion/<int:job_id>', views.category_deletion_status, name='category_deletion_status'),
     
     # Products
     path('api/products/product', views.product_list_create, name='product_list_create'),
+    path('api/products/product/facets', views.product_facets, name='product_facets'),
+    path('api/products/product/import', views.product_import, name='product_import'),
+    path('api/products/product/export', views.product_export, name='product_export'),
+    path('api/products/product/bulk', views.product_bulk_update, name='product_bulk_update'),
     path('api/products/product/<int:product_id>', views.product_detail, name='product_detail'),
+    path('api/products/product/<int:product_id>/related', views.product_related, name='product_related'),
+    
+    # Search
+    path('api/products/search', views.product_search, name='product_search'),
+    path('api/products/suggest', views.product_suggest, name='product_suggest'),
+    
+    # Change feed
+    path('api/products/changes', views.catalog_changes, name='catalog_changes'),
+    
+    # Cache
+    path('api/products/cache/stats', views.catalog_cache_stats, name='catalog_cache_stats'),
     
     # Stock management
     path('api/products/product/<int:product_id>/stock', stock_views.update_stock, name='update_stock'),
+    path('api/products/stock/adjust', stock_views.adjust_stock, name='adjust_stock'),
 ]
@@ -1,9 +1,47 @@
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from .models import Category, Product
-from .serializers import CategorySerializer, ProductSerializer, ProductDetailSerializer
+from .models import Category, CategoryDeletion, Product
+from .serializers import (
+    CategoryDeletionSerializer, CategorySerializer, ProductBulkUpdateSerializer, ProductDetailSerializer,
+    ProductSerializer
+)
+from .fast_serializers import (
+    PRODUCT_EXPANSIONS, PRODUCT_FIELDS, category_rows, product_rows, serialize_category_rows,
+    serialize_product_rows, serialize_subtree_totals
+)
+from .fields import InvalidFields, parse_fields, pick
+from .pagination import DEFAULT_ORDERING, ORDERINGS, InvalidCursor, paginate_products, parse_page_size
+from .filters import (
+    InvalidFilter, facet_counts, filter_products, missing_categories, order_products, parse_filters,
+    visible_categories, visible_products
+)
+from .search import search_product_ids
+from .conditional import make_validators, not_modified_response, queryset_validators, set_validators
+from .catalog_cache import cache_stats, cached_response
+from .detail_cache import cached_product_detail, detail_cache
+from .importer import ProductImporter, detect_format, iter_records
+from .export import CONTENT_TYPES, export_lines, keyset_chunks
+from .changes import FeedReset, changes_since
+from .related import TOP_K, related_product_ids
+from .suggest import suggest
+from .bulk import InvalidBulkUpdate, apply_expression, apply_updates, parse_expressions, parse_filter
+from .category_deletion import start_deletion
+from .category_tree import subtree_totals
+
+
+MAX_BATCH_SIZE = 100
+EXPORT_CHUNK_SIZE = 2000
+CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 1000
+SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 20
+# The detail payload always embeds the category
+DETAIL_FIELDS = tuple(ProductDetailSerializer.Meta.fields)
 
 
 def is_admin(user):
@@ -11,8 +49,39 @@ def is_admin(user):
     return user.is_staff or user.is_superuser
 
 
+def parse_id_list(value):
+    """Parse a comma separated list of ids, preserving order and dropping duplicates"""
+    ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit():
+            raise ValueError(f'Invalid product id: {part}')
+        if int(part) not in ids:
+            ids.append(int(part))
+    return ids
+
+
 # ==================== CATEGORY ENDPOINTS ====================
 
+def list_categories(request):
+    """Build the category listing response"""
+    categories = visible_categories()
+    etag, last_modified = queryset_validators(request, categories)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return set_validators(not_modified, etag, last_modified)
+
+    totals = subtree_totals()
+    data = [
+        {**row, **serialize_subtree_totals(totals.get(row['id']))}
+        for row in serialize_category_rows(category_rows(categories))
+    ]
+    response = Response(data, status=status.HTTP_200_OK)
+    return set_validators(response, etag, last_modified)
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
 def category_list_create(request):
@@ -21,9 +90,7 @@ def category_list_create(request):
     POST: Create a new category (admin only)
     """
     if request.method == 'GET':
-        categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return cached_response(request, 'category_list', lambda: list_categories(request))
 
     elif request.method == 'POST':
         # Check authentication
@@ -42,7 +109,8 @@ def category_list_create(request):
 
         serializer = CategorySerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -54,10 +122,12 @@ def category_detail(request, category_id):
     GET: Retrieve a specific category
     PUT: Update a category (admin only)
     DELETE: Delete a category (admin only)
+    Query params (DELETE): async (optional, true to hide the category at once
+    and delete its products in the background; responds 202 with the job)
     """
-    try:
-        category = Category.objects.get(id=category_id)
-    except Category.DoesNotExist:
+    category = Category.objects.filter(id=category_id).first()
+    # A category being deleted in the background only answers DELETE, with its job
+    if category is None or (category.deleting and request.method != 'DELETE'):
         return Response(
             {'error': 'Category not found.'},
             status=status.HTTP_404_NOT_FOUND
@@ -65,7 +135,8 @@ def category_detail(request, category_id):
 
     if request.method == 'GET':
         serializer = CategorySerializer(category)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        totals = subtree_totals([category.id]).get(category.id)
+        return Response({**serializer.data, **serialize_subtree_totals(totals)}, status=status.HTTP_200_OK)
 
     elif request.method == 'PUT':
         # Check authentication
@@ -84,7 +155,8 @@ def category_detail(request, category_id):
 
         serializer = CategorySerializer(category, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -103,6 +175,16 @@ def category_detail(request, category_id):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        if category.children.exists():
+            return Response(
+                {'error': 'Category has subcategories; move or delete them first.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if category.deleting or request.query_params.get('async', '').lower() in ('1', 'true', 'yes'):
+            job = start_deletion(category)
+            return Response(CategoryDeletionSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
         category.delete()
         return Response(
             {'message': 'Category deleted successfully.'},
@@ -110,33 +192,119 @@ def category_detail(request, category_id):
         )
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def category_deletion_status(request, job_id):
+    """GET: Progress of a background category deletion (admin only)"""
+    if not request.user.is_authenticated:
+        return Response(
+            {'error': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    if not is_admin(request.user):
+        return Response(
+            {'error': 'You do not have permission to view category deletions.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    try:
+        job = CategoryDeletion.objects.get(id=job_id)
+    except CategoryDeletion.DoesNotExist:
+        return Response(
+            {'error': 'Category deletion not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(CategoryDeletionSerializer(job).data, status=status.HTTP_200_OK)
+
+
 # ==================== PRODUCT ENDPOINTS ====================
 
+def list_products(request):
+    """Build the product listing response (batch lookup, paginated or full)"""
+    if 'ids' in request.query_params:
+        return product_batch(request)
+
+    try:
+        filters = parse_filters(request.query_params)
+        fields, expand = parse_fields(request.query_params, PRODUCT_FIELDS, PRODUCT_EXPANSIONS)
+    except (InvalidFilter, InvalidFields) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    products = filter_products(filters)
+
+    etag, last_modified = queryset_validators(request, products, 'category__updated_at')
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return set_validators(not_modified, etag, last_modified)
+
+    ordering = filters['ordering'] or DEFAULT_ORDERING
+    # Pagination cursors are built from the sort column and id
+    products = product_rows(products, fields, expand, extra=(ORDERINGS[ordering][0],))
+
+    if 'limit' in request.query_params or 'cursor' in request.query_params:
+        try:
+            page_size = parse_page_size(request.query_params.get('limit'))
+            page, next_cursor = paginate_products(
+                products,
+                cursor=request.query_params.get('cursor'),
+                page_size=page_size,
+                ordering=ordering
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {'results': serialize_product_rows(page, request, fields, expand), 'next': next_cursor}
+        rows = page
+    else:
+        data = rows = serialize_product_rows(
+            order_products(products, filters['ordering']), request, fields, expand
+        )
+
+    # Only look categories up when nothing matched, to tell "empty" from "unknown"
+    if not rows and filters['category_ids'] and missing_categories(filters):
+        return Response(
+            {'error': 'Category not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return set_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified)
+
+
+def list_product_facets(request):
+    """Build the facet counts response for the listing filters"""
+    try:
+        filters = parse_filters(request.query_params)
+    except InvalidFilter as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    etag, last_modified = queryset_validators(request, visible_products(), 'category__updated_at')
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return set_validators(not_modified, etag, last_modified)
+
+    response = Response(facet_counts(filters), status=status.HTTP_200_OK)
+    return set_validators(response, etag, last_modified)
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
 def product_list_create(request):
     """
-    GET: List all products with optional category filter
+    GET: List all products with optional filters
     POST: Create a new product (admin only)
-    Query params: category_id (optional)
+    Query params: fields (optional, comma separated product fields to return),
+    expand (optional, category to embed the category object instead of its id),
+    category_id (optional, one id or a comma separated list;
+    products of subcategories are included),
+    min_price, max_price, in_stock, ordering (optional, one of newest, oldest,
+    price, -price, name, -name), limit and cursor (optional, enable
+    cursor pagination; the response becomes {"results": [...], "next": cursor}),
+    ids (optional, comma separated batch lookup; the response becomes
+    {"results": [...], "missing": [...]})
     """
     if request.method == 'GET':
-        category_id = request.query_params.get('category_id', None)
-        
-        if category_id:
-            try:
-                category = Category.objects.get(id=category_id)
-                products = Product.objects.filter(category=category)
-            except Category.DoesNotExist:
-                return Response(
-                    {'error': 'Category not found.'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-        else:
-            products = Product.objects.all()
-
-        serializer = ProductSerializer(products, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return cached_response(request, 'product_list', lambda: list_products(request))
 
     elif request.method == 'POST':
         # Check authentication
@@ -155,11 +323,222 @@ def product_list_create(request):
 
         serializer = ProductSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            # Keep the stock ledger entry in the same transaction as the write
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_facets(request):
+    """
+    GET: Facet counts (per category, per price bucket) for the listing filters
+    Query params: same filters as the product listing
+    """
+    return cached_response(request, 'product_facets', lambda: list_product_facets(request))
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def product_import(request):
+    """
+    POST: Bulk import products from an uploaded CSV or NDJSON file (admin only)
+    Form fields: file (required), format (optional, csv or ndjson),
+    create_categories (optional, create unknown categories by name)
+    """
+    # Check authentication
+    if not request.user.is_authenticated:
+        return Response(
+            {'error': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    # Check if admin
+    if not is_admin(request.user):
+        return Response(
+            {'error': 'You do not have permission to import products.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'An import file is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    fmt = request.data.get('format') or detect_format(upload.name)
+    if fmt not in ('csv', 'ndjson'):
+        return Response({'error': 'format must be csv or ndjson.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    importer = ProductImporter(create_categories=request.data.get('create_categories') in ('true', '1', True))
+    report = importer.run(iter_records(upload, fmt))
+    return Response(report, status=status.HTTP_200_OK)
+
+
+@api_view(['PATCH'])
+@permission_classes([AllowAny])
+def product_bulk_update(request):
+    """
+    PATCH: Update many products in one transaction (admin only)
+    Body: {"updates": [{"id": 1, "price": "9.99", "stock": 5}, ...]}
+    or {"filter": {<listing filters>, "ids": [...]},
+        "update": {"price": {"set" | "multiply" | "add": ...},
+                   "stock": {"set" | "add": ...}, "category": {"set": id}}}
+    Optional "reference" is recorded with any stock changes.
+    """
+    # Check authentication
+    if not request.user.is_authenticated:
+        return Response(
+            {'error': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    # Check if admin
+    if not is_admin(request.user):
+        return Response(
+            {'error': 'You do not have permission to update products.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    reference = str(request.data.get('reference', ''))[:100]
+    try:
+        if 'updates' in request.data:
+            updates = request.data['updates']
+            if not isinstance(updates, list) or not updates:
+                raise InvalidBulkUpdate('updates must be a non-empty list.')
+            serializer = ProductBulkUpdateSerializer(data=updates, many=True)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            updated, missing = apply_updates(serializer.validated_data, reference)
+            return Response({'updated': updated, 'missing': missing}, status=status.HTTP_200_OK)
+
+        queryset = parse_filter(request.data.get('filter'))
+        expressions = parse_expressions(request.data.get('update'))
+        updated = apply_expression(queryset, expressions, reference)
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
+    except InvalidBulkUpdate as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_export(request):
+    """
+    GET: Stream the whole catalog as NDJSON or CSV
+    Query params: output (optional, ndjson or csv), updated_since (optional,
+    ISO 8601 datetime; only products updated at or after it are exported)
+    """
+    fmt = request.query_params.get('output', 'ndjson')
+    if fmt not in CONTENT_TYPES:
+        return Response({'error': 'output must be ndjson or csv.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    products = visible_products()
+    updated_since = request.query_params.get('updated_since')
+    if updated_since:
+        since = parse_datetime(updated_since)
+        if since is None:
+            return Response({'error': 'updated_since must be an ISO 8601 datetime.'}, status=status.HTTP_400_BAD_REQUEST)
+        products = products.filter(updated_at__gte=since)
+
+    rows = keyset_chunks(product_rows(products), EXPORT_CHUNK_SIZE)
+    response = StreamingHttpResponse(export_lines(fmt, rows, request), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="products.{fmt}"'
+    return response
+
+
+def product_batch(request):
+    """Return the requested products from a single id__in query"""
+    try:
+        ids = parse_id_list(request.query_params['ids'])
+        fields, expand = parse_fields(request.query_params, PRODUCT_FIELDS, PRODUCT_EXPANSIONS)
+    except (ValueError, InvalidFields) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not ids:
+        return Response({'error': 'ids must not be empty.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > MAX_BATCH_SIZE:
+        return Response(
+            {'error': f'At most {MAX_BATCH_SIZE} ids can be requested at once.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    products = visible_products().filter(id__in=ids)
+    etag, last_modified = queryset_validators(request, products, 'category__updated_at')
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return set_validators(not_modified, etag, last_modified)
+
+    rows = {row['id']: row for row in product_rows(products, fields, expand)}
+    response = Response(
+        {
+            'results': serialize_product_rows([rows[i] for i in ids if i in rows], request, fields, expand),
+            'missing': [i for i in ids if i not in rows],
+        },
+        status=status.HTTP_200_OK
+    )
+    return set_validators(response, etag, last_modified)
+
+
+def retrieve_product(request, product_id):
+    """Build the product detail response"""
+    try:
+        fields, _ = parse_fields(request.query_params, DETAIL_FIELDS, PRODUCT_EXPANSIONS)
+    except InvalidFields as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Served from the hot detail cache, so a sparse response only trims the payload
+    detail = cached_product_detail(request, product_id)
+    if detail is None:
+        return Response(
+            {'error': 'Product not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    data, updated_at, category_updated_at = detail
+    etag, last_modified = make_validators(
+        request.build_absolute_uri(), updated_at, category_updated_at,
+        last_modified=max(updated_at, category_updated_at)
+    )
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return set_validators(not_modified, etag, last_modified)
+
+    return set_validators(Response(pick(data, fields), status=status.HTTP_200_OK), etag, last_modified)
+
+
+def list_related_products(request, product_id):
+    """Build the "frequently bought together" response for a product"""
+    if not visible_products().filter(id=product_id).exists():
+        return Response(
+            {'error': 'Product not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        limit = min(parse_page_size(request.query_params.get('limit')), TOP_K)
+        fields, expand = parse_fields(request.query_params, PRODUCT_FIELDS, PRODUCT_EXPANSIONS)
+    except (InvalidCursor, InvalidFields) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    ids = related_product_ids(product_id, limit)
+    rows = {
+        row['id']: row
+        for row in product_rows(visible_products().filter(id__in=ids), fields, expand, extra=('updated_at',))
+    }
+    # Related products deleted since the last pipeline run are dropped
+    results = serialize_product_rows([rows[i] for i in ids if i in rows], request, fields, expand)
+
+    timestamps = [rows[i]['updated_at'] for i in ids if i in rows]
+    etag, last_modified = make_validators(
+        request.build_absolute_uri(), *ids, *timestamps,
+        last_modified=max(timestamps) if timestamps else None
+    )
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return set_validators(not_modified, etag, last_modified)
+    return set_validators(Response({'results': results}, status=status.HTTP_200_OK), etag, last_modified)
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([AllowAny])
 def product_detail(request, product_id):
@@ -167,20 +546,20 @@ def product_detail(request, product_id):
     GET: Retrieve a specific product
     PUT: Update a product (admin only)
     DELETE: Delete a product (admin only)
+    Query params (GET): fields (optional, comma separated fields to return)
     """
+    if request.method == 'GET':
+        return cached_response(request, 'product_detail', lambda: retrieve_product(request, product_id))
+
     try:
-        product = Product.objects.get(id=product_id)
+        product = visible_products().get(id=product_id)
     except Product.DoesNotExist:
         return Response(
             {'error': 'Product not found.'},
             status=status.HTTP_404_NOT_FOUND
         )
 
-    if request.method == 'GET':
-        serializer = ProductDetailSerializer(product, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    elif request.method == 'PUT':
+    if request.method == 'PUT':
         # Check authentication
         if not request.user.is_authenticated:
             return Response(
@@ -197,7 +576,8 @@ def product_detail(request, product_id):
 
         serializer = ProductSerializer(product, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -221,3 +601,108 @@ def product_detail(request, product_id):
             {'message': 'Product deleted successfully.'},
             status=status.HTTP_204_NO_CONTENT
         )
+
+
+# ==================== SEARCH ENDPOINTS ====================
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_search(request):
+    """
+    GET: Full-text search over product name, description and category name
+    Query params: q (required), limit (optional), fields and expand (optional,
+    as for the product listing)
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Query parameter q is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = parse_page_size(request.query_params.get('limit'))
+        fields, expand = parse_fields(request.query_params, PRODUCT_FIELDS, PRODUCT_EXPANSIONS)
+    except (InvalidCursor, InvalidFields) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    ids = search_product_ids(query, limit)
+    rows = {row['id']: row for row in product_rows(visible_products().filter(id__in=ids), fields, expand)}
+    results = serialize_product_rows([rows[i] for i in ids if i in rows], request, fields, expand)
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_related(request, product_id):
+    """
+    GET: Products frequently bought together with this one, best first
+    Query params: limit (optional, at most the precomputed top-K), fields and
+    expand (optional, as for the product listing)
+    """
+    return cached_response(request, 'product_related', lambda: list_related_products(request, product_id))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_suggest(request):
+    """
+    GET: As-you-type product and category name suggestions, most popular first
+    Query params: prefix (required), limit (optional)
+    """
+    prefix = request.query_params.get('prefix', '').strip()
+    if not prefix:
+        return Response({'error': 'Query parameter prefix is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    limit = request.query_params.get('limit', '')
+    if limit and not limit.isdigit():
+        return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(int(limit or SUGGEST_LIMIT), MAX_SUGGEST_LIMIT))
+
+    return Response({'suggestions': suggest(prefix, limit)}, status=status.HTTP_200_OK)
+
+
+# ==================== CHANGE FEED ====================
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def catalog_changes(request):
+    """
+    GET: Product upserts and deletes after a feed version
+    Query params: since (optional, default 0 = full snapshot), limit (optional)
+    Responds 410 when since is ahead of the feed, e.g. after a database reset.
+    """
+    since = request.query_params.get('since', '0')
+    if not since.isdigit():
+        return Response({'error': 'since must be a non-negative integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    limit = request.query_params.get('limit', '')
+    if limit and not limit.isdigit():
+        return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(int(limit or CHANGES_PAGE_SIZE), MAX_CHANGES_PAGE_SIZE))
+
+    try:
+        return Response(changes_since(int(since), limit, request), status=status.HTTP_200_OK)
+    except FeedReset:
+        return Response(
+            {'error': 'Version is ahead of the change feed; resync from since=0.'},
+            status=status.HTTP_410_GONE
+        )
+
+
+# ==================== CACHE ENDPOINTS ====================
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def catalog_cache_stats(request):
+    """GET: Catalog response cache and hot product detail cache statistics (admin only)"""
+    if not request.user.is_authenticated:
+        return Response(
+            {'error': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    if not is_admin(request.user):
+        return Response(
+            {'error': 'You do not have permission to view cache statistics.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    return Response({**cache_stats(), 'detail': detail_cache.stats()}, status=status.HTTP_200_OK)
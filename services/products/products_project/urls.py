@@ -2,15 +2,19 @@
 URL configuration for products_project.
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from products_app.media_views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('products_app.urls')),
+    # Served in every environment: ranges, validators and cache headers
+    # (see products_app.media_views); set MEDIA_ACCEL_REDIRECT_PREFIX to hand
+    # transfers to a front proxy
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.+)$', serve_media, name='media'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -9,3 +9,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'products_project.settings')
 
 application = get_wsgi_application()
+
+# Load the typeahead index before the first request needs it
+from products_app.suggest import warm  # noqa: E402
+
+warm()